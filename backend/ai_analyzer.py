@@ -1,9 +1,10 @@
 import os
 import json
 from datetime import datetime
-from openai import OpenAI
 import pandas as pd
 from .config import get_data_path
+from .frame_cache import clean_float
+from .prompt_builder import build_messages, TOOLS, DEFAULT_TOKEN_BUDGET
 
 class AIAnalyzer:
     def __init__(self, api_key=None, base_url=None, model_name=None):
@@ -11,6 +12,7 @@ class AIAnalyzer:
         self.api_key = api_key
         self.base_url = base_url
         self.model_name = model_name
+        self.prompt_token_budget = DEFAULT_TOKEN_BUDGET
         
         # Load from file if exists, otherwise use env or defaults
         self._load_config()
@@ -34,6 +36,7 @@ class AIAnalyzer:
                     self.api_key = config.get("api_key", self.api_key)
                     self.base_url = config.get("base_url", self.base_url)
                     self.model_name = config.get("model_name", self.model_name)
+                    self.prompt_token_budget = config.get("prompt_token_budget", self.prompt_token_budget)
             except Exception as e:
                 print(f"Error loading AI config: {e}")
 
@@ -43,14 +46,16 @@ class AIAnalyzer:
             config = {
                 "api_key": self.api_key,
                 "base_url": self.base_url,
-                "model_name": self.model_name
+                "model_name": self.model_name,
+                "prompt_token_budget": self.prompt_token_budget
             }
             with open(self.config_path, "w", encoding="utf-8") as f:
                 json.dump(config, f, indent=4)
         except Exception as e:
             print(f"Error saving AI config: {e}")
 
-    def update_config(self, api_key: str = None, base_url: str = None, model_name: str = None, save: bool = True):
+    def update_config(self, api_key: str = None, base_url: str = None, model_name: str = None,
+                      prompt_token_budget: int = None, save: bool = True):
         """Update AI configuration and re-initialize client"""
         if api_key is not None:
             self.api_key = api_key
@@ -58,16 +63,31 @@ class AIAnalyzer:
             self.base_url = base_url
         if model_name is not None:
             self.model_name = model_name
+        if prompt_token_budget is not None:
+            self.prompt_token_budget = prompt_token_budget
             
-        # Only initialize client if api_key is valid and not placeholder
-        if self.api_key and self.api_key not in ["YOUR_API_KEY", ""]:
-            self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
-        else:
-            self.client = None
+        # The client is (re)built lazily on next access, see the client property
+        self._client = None
             
         if save:
             self._save_config()
 
+    @property
+    def is_demo(self) -> bool:
+        """True when no usable API key is configured"""
+        return not self.api_key or self.api_key in ["YOUR_API_KEY", ""]
+
+    @property
+    def client(self):
+        """OpenAI client, created on first use (None in demo mode)"""
+        if self.is_demo:
+            return None
+        if self._client is None:
+            # Imported lazily: the openai package is slow to import and unused in demo mode
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
     def _generate_mock_report(self, symbol: str, df: pd.DataFrame) -> str:
         """Generate a professional mock report when AI is disabled"""
         if df is None or df.empty or len(df) < 2:
@@ -111,20 +131,21 @@ class AIAnalyzer:
             if sim_date:
                 yield f"> 🧪 **预演模式**: 当前模拟日期为 `{sim_date}`\n\n"
                 # 找到 sim_date 在 df 中的位置
-                df['DateStr'] = df['Date'].dt.strftime('%Y-%m-%d')
-                mask = df['DateStr'] <= sim_date
-                df = df[mask].copy()
+                # df 可能来自共享缓存，只读不改
+                date_strs = df['Date'].dt.strftime('%Y-%m-%d')
+                mask = date_strs <= sim_date
+                df = df[mask]
                 if df.empty:
                     yield f"❌ 预演日期 {sim_date} 不在历史数据范围内。\n"
                     return
-                latest_price = float(df.iloc[-1]['Close'])
-                sim_date = df.iloc[-1]['DateStr'] # 确保日期格式统一
+                latest_price = clean_float(df['Close'].iloc[-1])
+                sim_date = date_strs[mask].iloc[-1] # 确保日期格式统一
                 
                 # 在预演模式下，需要根据模拟当天的价格重新计算仓位摘要
                 if pos_manager:
                     pos_summary = pos_manager.get_summary(symbol, current_price=latest_price)
             else:
-                latest_price = float(df.iloc[-1]['Close'])
+                latest_price = clean_float(df['Close'].iloc[-1])
             
             yield "> 🔍 **系统状态**: 正在获取实时行情与历史仓位数据...\n\n"
             
@@ -136,14 +157,6 @@ class AIAnalyzer:
                 yield self._generate_mock_report(symbol, df)
                 return
             
-            # Prepare data
-            latest = df.iloc[-1]
-            
-            # Prepare historical data (last 5 cycles)
-            hist_5 = df.tail(5).copy()
-            hist_5['Date'] = hist_5['Date'].astype(str)
-            hist_context = hist_5[['Date', 'Close', 'RSI', 'MACD', 'MA5', 'MA20']].to_dict(orient="records")
-            
             # Ensure pos_summary has all required keys to avoid KeyErrors
             if not pos_summary:
                 pos_summary = {
@@ -159,94 +172,17 @@ class AIAnalyzer:
                 pos_summary.setdefault('unrealized_pnl_pct', 0)
                 pos_summary.setdefault('history', [])
 
-            pos_context = f"当前持仓状态: {pos_summary['used_units']}/100 份\n"
-            pos_context += f"当前持仓均价: {pos_summary['avg_cost_price']:.2f}\n"
-            pos_context += f"当前持仓收益率: {pos_summary.get('unrealized_pnl_pct', 0)*100:.2f}%\n"
-            pos_context += "近期交易记录:\n"
-            for r in pos_summary['history'][-10:]:
-                action = "买入" if r['units'] > 0 else ("卖出" if r['units'] < 0 else "不操作")
-                conclusion_str = f" | 结论: {r.get('conclusion', r.get('reason', '无'))}"
-                pos_context += f"- {r['date']}: {action} {abs(r['units'])} 份 @ {r['price']:.2f}{conclusion_str}\n"
-
-            tools = [
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "execute_trade",
-                        "description": "执行买入或卖出操作。注意：只能操作当天，价格将自动按当前收盘价计算。",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "action": {
-                                    "type": "string",
-                                    "enum": ["buy", "sell"],
-                                    "description": "操作类型：buy (买入) 或 sell (卖出)"
-                                },
-                                "units": {
-                                    "type": "number",
-                                    "description": "操作份数 (1-100)"
-                                },
-                                "conclusion": {
-                                    "type": "string",
-                                    "description": "做出此交易决策的简要理由（将记录在交易历史中）"
-                                }
-                            },
-                            "required": ["action", "units", "conclusion"]
-                        }
-                    }
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "no_action",
-                        "description": "决定当日不执行任何买入或卖出操作。调用此工具将记录一条当日的‘不操作’历史，以确认分析已完成。",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "reason": {
-                                    "type": "string",
-                                    "description": "不操作的简要原因（将记录在交易历史中）"
-                                }
-                            },
-                            "required": ["reason"]
-                        }
-                    }
-                }
-            ]
-
-            system_prompt = f"""你是一个专业的股票/加密货币分析师和交易员。
-请基于提供的历史K线数据和当前的持仓情况，给出今日的分析报告和操作建议。
-
-你的任务：
-1. 分析当前的市场趋势、支撑阻力位。
-2. 结合当前的仓位（已使用 {pos_summary['used_units']}/100 份），决定是否需要买入、卖出或保持不动。
-3. **强制要求**：你必须调用 `execute_trade` 执行交易，或者调用 `no_action` 确认今日不操作。
-4. 如果你决定买入或卖出，请在 `conclusion` 中简要说明理由。如果你决定不操作，请在 `reason` 中简要说明理由。
-5. 你的分析必须基于当前日期 {sim_date if sim_date else "最新数据"} 的信息。
-
-请注意：预演模式下，你应该表现得像是在当天实时交易一样。
-"""
-
-            prompt = f"""
-            **近期市场数据 (最近5个周期):**
-            {json.dumps(hist_context, indent=2, ensure_ascii=False)}
-            
-            **仓位上下文与历史操作:**
-            {pos_context}
-            """
-
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ]
+            # Compact CSV context sized to the configured token budget
+            messages, prompt_stats = build_messages(df, pos_summary, sim_date=sim_date, token_budget=self.prompt_token_budget)
 
-            yield f"> 🧠 **AI 思考**: 正在审阅行情指标并评估交易机会 (模型: {self.model_name})...\n\n"
+            yield (f"> 🧠 **AI 思考**: 正在审阅行情指标并评估交易机会 (模型: {self.model_name}, "
+                   f"{prompt_stats['history_rows']} 个周期, 约 {prompt_stats['tokens']} tokens)...\n\n")
 
             # First call to check for tool usage
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
-                tools=tools,
+                tools=TOOLS,
                 tool_choice="auto"
             )
             
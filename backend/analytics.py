@@ -0,0 +1,190 @@
+"""Performance analytics for simulated (or real) trade histories.
+
+The ledger is replayed once per trade with the same rules as
+PositionManager.get_summary; everything per day (equity, drawdown, returns)
+is then computed with array operations. The metric helpers work along
+axis 0, so they accept a single curve or a 2-D block of curves at once.
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from .routing import classify_market
+from .timeframes import period_to_timedelta
+
+TRADING_DAYS = 252
+CRYPTO_DAYS = 365
+# Budget assumed when none is configured, so metrics still come out in percent
+NOMINAL_BUDGET = 100
+HISTORY_PERIODS = ["1y", "2y", "5y", "10y"]
+
+def periods_per_year(symbol: str) -> int:
+    return CRYPTO_DAYS if classify_market(symbol) == "crypto" else TRADING_DAYS
+
+def daily_closes(df: pd.DataFrame) -> pd.Series:
+    """Close series indexed by naive calendar date"""
+    dates = pd.to_datetime(df['Date'])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    closes = pd.Series(df['Close'].to_numpy(dtype=float), index=dates.dt.normalize())
+    return closes[~closes.index.duplicated(keep="last")].sort_index()
+
+def history_period(first_date) -> str:
+    """Smallest standard download period reaching back to first_date"""
+    age = datetime.now() - pd.Timestamp(first_date).to_pydatetime()
+    for period in HISTORY_PERIODS:
+        if period_to_timedelta(period) >= age:
+            return period
+    return "max"
+
+def replay_ledger(history, unit_amount: float) -> pd.DataFrame:
+    """Position state after each record (same rules as PositionManager.get_summary)"""
+    running_units = 0
+    avg_cost_price = 0
+    realized = 0
+    rows = []
+    for r in sorted(history, key=lambda x: x["date"]):
+        units = r["units"]
+        price = r["price"]
+        pnl = 0
+        if units > 0:
+            avg_cost_price = ((avg_cost_price * running_units) + (price * units)) / (running_units + units)
+            running_units += units
+        elif units < 0 and running_units > 0 and avg_cost_price > 0:
+            sell_units = abs(units)
+            pnl = (price / avg_cost_price - 1) * sell_units * unit_amount
+            realized += pnl
+            running_units -= sell_units
+            if running_units <= 0:
+                running_units = 0
+                avg_cost_price = 0
+        rows.append({
+            "date": pd.Timestamp(r["date"]).normalize(),
+            "units": running_units,
+            "avg_cost_price": avg_cost_price,
+            "realized_pnl": realized,
+            "traded": abs(units) * unit_amount,
+            "is_close": units < 0,
+            "pnl": pnl
+        })
+    return pd.DataFrame(rows, columns=["date", "units", "avg_cost_price", "realized_pnl", "traded", "is_close", "pnl"])
+
+def equity_curve(ledger: pd.DataFrame, closes: pd.Series, budget: float, unit_amount: float, total_units: int = 100,
+                 end=None) -> pd.DataFrame:
+    """Daily equity from the first trade on (up to end, if given), marking open units to the close"""
+    closes = closes[closes.index >= ledger["date"].iloc[0]]
+    if end is not None:
+        closes = closes[closes.index <= pd.Timestamp(end).normalize()]
+    # Several records on one day collapse to the end-of-day state
+    state = ledger.groupby("date").agg(
+        units=("units", "last"),
+        avg_cost_price=("avg_cost_price", "last"),
+        realized_pnl=("realized_pnl", "last"),
+        traded=("traded", "sum")
+    )
+    traded = state["traded"].reindex(closes.index, fill_value=0)
+    # Trades on non-trading days carry forward to the next close
+    state = state.drop(columns="traded").reindex(state.index.union(closes.index)).ffill().reindex(closes.index)
+    units = state["units"].to_numpy()
+    avg = state["avg_cost_price"].to_numpy()
+    close = closes.to_numpy()
+    holdings = units * unit_amount
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unrealized = np.where(avg > 0, (close / avg - 1) * holdings, 0.0)
+    equity = budget + state["realized_pnl"].to_numpy() + unrealized
+    return pd.DataFrame({
+        "close": close,
+        "units": units,
+        "exposure": units / total_units,
+        "equity": equity,
+        "drawdown": drawdowns(equity),
+        "traded": traded.to_numpy()
+    }, index=closes.index)
+
+def returns_from_equity(equity: np.ndarray) -> np.ndarray:
+    equity = np.asarray(equity, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = equity[1:] / equity[:-1] - 1
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+def drawdowns(equity: np.ndarray) -> np.ndarray:
+    equity = np.asarray(equity, dtype=float)
+    peak = np.maximum.accumulate(equity, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = np.where(peak > 0, equity / peak - 1, 0.0)
+    return dd
+
+def max_drawdown(equity: np.ndarray):
+    return drawdowns(equity).min(axis=0)
+
+def sharpe_ratio(returns: np.ndarray, periods: int = TRADING_DAYS):
+    returns = np.asarray(returns, dtype=float)
+    std = returns.std(axis=0, ddof=1) if len(returns) > 1 else np.zeros(returns.shape[1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(std > 0, returns.mean(axis=0) / std * np.sqrt(periods), 0.0)
+    return ratio
+
+def sortino_ratio(returns: np.ndarray, periods: int = TRADING_DAYS):
+    returns = np.asarray(returns, dtype=float)
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2, axis=0)) if len(returns) else np.zeros(returns.shape[1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(downside > 0, returns.mean(axis=0) / downside * np.sqrt(periods), 0.0)
+    return ratio
+
+def performance(ledger: pd.DataFrame, closes: pd.Series, budget: float, unit_amount: float, periods: int = TRADING_DAYS,
+                total_units: int = 100, end=None):
+    """Metrics and daily curve for one symbol; returns (metrics dict, curve frame)"""
+    curve = equity_curve(ledger, closes, budget, unit_amount, total_units, end=end)
+    if curve.empty:
+        return None, curve
+    equity = curve["equity"].to_numpy()
+    returns = returns_from_equity(equity)
+    closes_ = ledger[ledger["is_close"]]
+    days = len(curve)
+    turnover = curve["traded"].sum() / budget if budget else 0
+    metrics = {
+        "start_date": curve.index[0].strftime("%Y-%m-%d"),
+        "end_date": curve.index[-1].strftime("%Y-%m-%d"),
+        "days": days,
+        "final_equity": float(equity[-1]),
+        "total_return": float(equity[-1] / budget - 1) if budget else 0.0,
+        "annualized_return": float((equity[-1] / budget) ** (periods / max(days, 1)) - 1) if budget and equity[-1] > 0 else 0.0,
+        "max_drawdown": float(max_drawdown(equity)),
+        "sharpe": float(sharpe_ratio(returns, periods)),
+        "sortino": float(sortino_ratio(returns, periods)),
+        "win_rate": float((closes_["pnl"] > 0).mean()) if len(closes_) else 0.0,
+        "closed_trades": int(len(closes_)),
+        "turnover": float(turnover),
+        "annualized_turnover": float(turnover * periods / max(days, 1)),
+        "avg_exposure": float(curve["exposure"].mean()),
+        "time_in_market": float((curve["units"] > 0).mean())
+    }
+    return metrics, curve
+
+def position_performance(symbol: str, pos: dict, fetch_daily, end=None):
+    """Evaluate one symbol of positions.json; fetch_daily(symbol, period) returns daily bars.
+
+    end (a date) stops the curve there, e.g. at the last day of a simulation.
+    """
+    history = pos.get("history", [])
+    if not history:
+        return {"symbol": symbol, "error": "No trade history"}
+    budget = pos.get("total_budget", 0)
+    total_units = pos.get("total_units", 100)
+    if budget <= 0:
+        budget = NOMINAL_BUDGET
+    unit_amount = budget / total_units
+    ledger = replay_ledger(history, unit_amount)
+    df = fetch_daily(symbol, history_period(ledger["date"].iloc[0]))
+    if df is None or df.empty:
+        return {"symbol": symbol, "error": "Price history unavailable"}
+    metrics, curve = performance(ledger, daily_closes(df), budget, unit_amount, periods_per_year(symbol), total_units, end=end)
+    if metrics is None:
+        return {"symbol": symbol, "error": "No prices after the first trade"}
+    return {
+        "symbol": symbol,
+        "metrics": metrics,
+        "curve": [
+            {"date": d.strftime("%Y-%m-%d"), "equity": float(e), "drawdown": float(dd), "exposure": float(x)}
+            for d, e, dd, x in zip(curve.index, curve["equity"], curve["drawdown"], curve["exposure"])
+        ]
+    }
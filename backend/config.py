@@ -17,3 +17,15 @@ def get_data_dir():
 def get_data_path(filename):
     """Get the full path for a data file"""
     return get_data_dir() / filename
+
+# Major global indices and crypto shown on the dashboard (display name -> symbol)
+INDICES_CONFIG = {
+    "标普 500": "^GSPC",
+    "纳斯达克 100": "^IXIC",
+    "上证指数": "000001.SS",
+    "恒生指数": "^HSI",
+    "沪深 300": "000300.SS",
+    "日经 225": "^N225",
+    "比特币": "BTC-USD",
+    "以太坊": "ETH-USD"
+}
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Tunables, overridable from the command line (see __main__ below)
+settings = {
+    "latency": 0.5,           # seconds before the first byte of any completion
+    "tokens_per_second": 50,  # streaming rate for the final report
+    "report_tokens": 200,     # number of content chunks in a streamed report
+    "error_rate": 0.0,        # fraction of requests answered with HTTP 500
+    "trade_ratio": 0.5        # fraction of tool calls that are execute_trade instead of no_action
+}
+
+REPORT_WORDS = ["趋势", "支撑", "阻力", "均线", "RSI", "MACD", "放量", "回调", "震荡", "突破", "观望", "仓位"]
+
+app = FastAPI(title="WFMoney Fake LLM")
+
+def _completion_id():
+    return f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+def _tool_call():
+    """Build a random execute_trade / no_action call like a real model would"""
+    if random.random() < settings["trade_ratio"]:
+        name = "execute_trade"
+        args = {
+            "action": random.choice(["buy", "sell"]),
+            "units": random.randint(1, 10),
+            "conclusion": "压测模拟交易"
+        }
+    else:
+        name = "no_action"
+        args = {"reason": "压测模拟不操作"}
+    return {
+        "id": f"call_{uuid.uuid4().hex[:24]}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(args, ensure_ascii=False)}
+    }
+
+@app.get("/v1/models")
+def list_models():
+    return {"object": "list", "data": [{"id": "fake-model", "object": "model", "owned_by": "wfmoney"}]}
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """OpenAI-compatible chat completion endpoint with tunable latency"""
+    body = await request.json()
+    model = body.get("model", "fake-model")
+    created = int(time.time())
+
+    await asyncio.sleep(settings["latency"])
+
+    if random.random() < settings["error_rate"]:
+        return JSONResponse(status_code=500, content={"error": {"message": "injected failure", "type": "server_error"}})
+
+    if not body.get("stream"):
+        if body.get("tools"):
+            message = {"role": "assistant", "content": None, "tool_calls": [_tool_call()]}
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": " ".join(random.choices(REPORT_WORDS, k=settings["report_tokens"]))}
+            finish_reason = "stop"
+        return {
+            "id": _completion_id(),
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": settings["report_tokens"], "total_tokens": settings["report_tokens"]}
+        }
+
+    completion_id = _completion_id()
+    delay = 1.0 / settings["tokens_per_second"] if settings["tokens_per_second"] > 0 else 0
+
+    def chunk(delta, finish_reason=None):
+        data = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def generate():
+        yield chunk({"role": "assistant", "content": ""})
+        for i in range(settings["report_tokens"]):
+            yield chunk({"content": random.choice(REPORT_WORDS) + " "})
+            if delay:
+                await asyncio.sleep(delay)
+        yield chunk({}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=settings["latency"], help="Seconds before the first byte")
+    parser.add_argument("--tokens-per-second", type=float, default=settings["tokens_per_second"], help="Streaming rate (0 = no delay)")
+    parser.add_argument("--report-tokens", type=int, default=settings["report_tokens"], help="Chunks per streamed report")
+    parser.add_argument("--error-rate", type=float, default=settings["error_rate"], help="Fraction of requests failing with HTTP 500")
+    parser.add_argument("--trade-ratio", type=float, default=settings["trade_ratio"], help="Fraction of tool calls that trade")
+
+def apply_arguments(args):
+    settings["latency"] = args.latency
+    settings["tokens_per_second"] = args.tokens_per_second
+    settings["report_tokens"] = args.report_tokens
+    settings["error_rate"] = args.error_rate
+    settings["trade_ratio"] = args.trade_ratio
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server for WFMoney load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_arguments(parser)
+    args = parser.parse_args()
+    apply_arguments(args)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
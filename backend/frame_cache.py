@@ -0,0 +1,161 @@
+"""In-process LRU tier in front of the disk cache.
+
+Hot frames are kept unpickled in memory up to a byte budget
+(WFMONEY_FRAME_CACHE_MB, default 256) and evicted least-recently-used first.
+Frames are compacted before they are stored: float64 columns become float32
+when every value has at most 7 significant digits (so expand_frame restores
+it exactly), object columns become numeric, dates become datetime64 and
+redundant columns are dropped.
+
+Frames returned by the cache are shared between requests; treat them as
+read-only and copy() before adding columns.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = int(float(os.getenv("WFMONEY_FRAME_CACHE_MB", "256")) * 1024 * 1024)
+REDUNDANT_COLUMNS = ["BB_Std", "DateStr", "Dividends", "Stock Splits", "Capital Gains"]
+FLOAT32_DIGITS = 7
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a smaller copy of df with the same information"""
+    df = df.drop(columns=[c for c in REDUNDANT_COLUMNS if c in df.columns])
+    for col in df.columns:
+        series = df[col]
+        if col == 'Date':
+            if not pd.api.types.is_datetime64_any_dtype(series):
+                df[col] = pd.to_datetime(series)
+            continue
+        if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            # pandas 3 reads text as StringDtype rather than object
+            try:
+                series = pd.to_numeric(series)
+            except (ValueError, TypeError):
+                continue
+            if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+                # Nullable Float64 / Int64 from string input: back to numpy, NA -> NaN
+                series = series.astype(np.float64 if series.hasnans else series.dtype.numpy_dtype)
+        if series.dtype == np.float64:
+            narrow = series.astype(np.float32)
+            # Only when the round trip is exact: 112345.67 or a 10-digit volume stays float64
+            if np.array_equal(restore_precision(narrow.to_numpy()), series.to_numpy(), equal_nan=True):
+                series = narrow
+        elif pd.api.types.is_integer_dtype(series):
+            series = pd.to_numeric(series, downcast="integer")
+        df[col] = series
+    return df
+
+def restore_precision(values):
+    """Round float32-derived values to 7 significant digits as float64 (3919.469970703125 -> 3919.47)"""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        magnitude = np.floor(np.log10(np.abs(values)))
+        scale = np.where(np.isfinite(magnitude), 10.0 ** (FLOAT32_DIGITS - 1 - magnitude), 1.0)
+        return np.where(np.isfinite(magnitude), np.round(values * scale) / scale, values)
+
+def clean_float(value) -> float:
+    """Python float for a scalar read from a compacted frame"""
+    if isinstance(value, np.float32):
+        return float(restore_precision(value))
+    return float(value)
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of df with float32 columns restored to float64 for JSON output"""
+    float32_cols = [c for c in df.columns if df[c].dtype == np.float32]
+    if not float32_cols:
+        return df
+    df = df.copy()
+    for col in float32_cols:
+        df[col] = restore_precision(df[col].to_numpy())
+    return df
+
+def _compact(value):
+    if isinstance(value, pd.DataFrame):
+        return compact_frame(value)
+    if isinstance(value, dict) and isinstance(value.get("df"), pd.DataFrame):
+        return {**value, "df": compact_frame(value["df"])}
+    return value
+
+def _size(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict) and isinstance(value.get("df"), pd.DataFrame):
+        return _size(value["df"]) + 256
+    return 256
+
+class FrameCache:
+    """diskcache-compatible subset (get / set / in / []) with a memory-bounded hot tier"""
+    def __init__(self, disk, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.disk = disk
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hot = OrderedDict()  # key -> (value, size, expires_at)
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _drop(self, key):
+        _, size, _ = self.hot.pop(key)
+        self.bytes -= size
+
+    def _remember(self, key, value, expires_at):
+        size = _size(value)
+        with self.lock:
+            if key in self.hot:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            self.hot[key] = (value, size, expires_at)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self.hot)))
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.hot.get(key)
+            if item is not None:
+                if item[2] is None or item[2] > time.time():
+                    self.hot.move_to_end(key)
+                    self.hits += 1
+                    return item[0]
+                self._drop(key)
+        value, expire_time = self.disk.get(key, default=None, expire_time=True)
+        if value is None:
+            with self.lock:
+                self.misses += 1
+            return default
+        with self.lock:
+            self.disk_hits += 1
+        self._remember(key, value, expire_time)
+        return value
+
+    def set(self, key, value, expire=None):
+        value = _compact(value)
+        self.disk.set(key, value, expire=expire)
+        self._remember(key, value, time.time() + expire if expire else None)
+        return True
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.hot),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
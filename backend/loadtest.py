@@ -0,0 +1,274 @@
+"""End-to-end load generator for the WFMoney API.
+
+Usage (from the project root):
+    python -m backend.loadtest --concurrency 20 --duration 60
+
+Without --app-url the tool spawns a fake LLM server and a uvicorn process of
+backend.main wired to it, using a throw-away data directory so the real
+ai_config.json / positions.json are never touched. With --app-url the
+scenarios that write to positions.json (analyze, positions) only run when
+--allow-writes is given.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+import requests
+from . import fake_llm_server
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_MIX = "indices=1,history=3,analyze=1,positions=2"
+# Scenarios that modify positions.json (analyze records the AI's trades)
+WRITE_SCENARIOS = {"analyze", "positions"}
+
+class Stats:
+    """Thread-safe collector of per-endpoint samples"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, name, ok, latency, ttfb):
+        with self.lock:
+            entry = self.samples.setdefault(name, {"ok": 0, "errors": 0, "latency": [], "ttfb": []})
+            entry["ok" if ok else "errors"] += 1
+            entry["latency"].append(latency)
+            entry["ttfb"].append(ttfb)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def timed_request(session, method, url, stats, name, stream=False, **kwargs):
+    """Issue one request and record latency, time-to-first-byte and error state; returns the JSON body"""
+    start = time.perf_counter()
+    ttfb = None
+    ok = False
+    data = None
+    try:
+        resp = session.request(method, url, stream=stream, timeout=300, **kwargs)
+        if stream:
+            body = b""
+            for chunk in resp.iter_content(chunk_size=None):
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+                body += chunk
+            text = body.decode("utf-8", errors="replace")
+            ok = resp.ok and "❌" not in text
+        else:
+            ttfb = resp.elapsed.total_seconds()
+            data = resp.json()
+            ok = resp.ok and not (isinstance(data, dict) and "error" in data)
+    except Exception as e:
+        print(f"{name} request failed: {e}")
+    latency = time.perf_counter() - start
+    stats.add(name, ok, latency, ttfb if ttfb is not None else latency)
+    return data
+
+def scenario_indices(session, base, symbol, stats, args):
+    timed_request(session, "GET", f"{base}/api/market/indices", stats, "indices")
+
+def scenario_history(session, base, symbol, stats, args):
+    timed_request(session, "GET", f"{base}/api/market/history", stats, "history", params={"symbol": symbol, "period": "1y"})
+
+def scenario_analyze(session, base, symbol, stats, args):
+    params = {"symbol": symbol}
+    if args.sim_date:
+        params["sim_date"] = args.sim_date
+    timed_request(session, "GET", f"{base}/api/market/analyze", stats, "analyze", stream=True, params=params)
+
+def scenario_positions(session, base, symbol, stats, args):
+    timed_request(session, "GET", f"{base}/api/positions/summary", stats, "positions/summary", params={"symbol": symbol})
+    # Writes go to a throw-away symbol per worker thread, never to a real holding
+    scratch = f"LOADTEST-{threading.get_ident()}"
+    record = {"symbol": scratch, "date": time.strftime("%Y-%m-%d"), "units": 1, "price": 100.0}
+    position = timed_request(session, "POST", f"{base}/api/positions/record", stats, "positions/record", json=record)
+    history = position.get("history", []) if isinstance(position, dict) else []
+    # History is sorted by date, so look up where the new record landed
+    matches = [i for i, r in enumerate(history) if all(r.get(k) == record[k] for k in ("date", "units", "price"))]
+    if matches:
+        timed_request(session, "DELETE", f"{base}/api/positions/record", stats, "positions/delete",
+                      params={"symbol": scratch, "index": matches[-1]})
+
+SCENARIOS = {
+    "indices": scenario_indices,
+    "history": scenario_history,
+    "analyze": scenario_analyze,
+    "positions": scenario_positions
+}
+
+def parse_mix(mix):
+    """Parse 'name=weight,...' into parallel name / weight lists"""
+    names, weights = [], []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}', expected one of {', '.join(SCENARIOS)}")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+def wait_until_ready(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+def spawn_servers(args):
+    """Start the fake LLM and an isolated backend, returning (app_url, processes)"""
+    processes = []
+    llm_cmd = [
+        sys.executable, "-m", "backend.fake_llm_server",
+        "--port", str(args.llm_port),
+        "--latency", str(args.latency),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--report-tokens", str(args.report_tokens),
+        "--error-rate", str(args.error_rate),
+        "--trade-ratio", str(args.trade_ratio)
+    ]
+    processes.append(subprocess.Popen(llm_cmd, cwd=str(ROOT_DIR)))
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="wfmoney_loadtest_")
+    print(f"Backend data directory: {data_dir}")
+    env = dict(os.environ)
+    # config.get_data_dir() resolves LOCALAPPDATA first, so this isolates all state
+    env["LOCALAPPDATA"] = data_dir
+    env["OPENAI_API_KEY"] = "loadtest"
+    env["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}/v1"
+    env["OPENAI_MODEL_NAME"] = "fake-model"
+    # Startup cache warming would download during the measurement window
+    env["WFMONEY_SCHEDULER"] = "0"
+    app_cmd = [
+        sys.executable, "-m", "uvicorn", "backend.main:app",
+        "--host", "127.0.0.1", "--port", str(args.app_port), "--log-level", "warning"
+    ]
+    processes.append(subprocess.Popen(app_cmd, cwd=str(ROOT_DIR), env=env))
+
+    if not wait_until_ready(f"http://127.0.0.1:{args.llm_port}/v1/models"):
+        raise RuntimeError("Fake LLM server did not start")
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    if not wait_until_ready(f"{app_url}/api/config"):
+        raise RuntimeError("Backend did not start")
+    return app_url, processes
+
+def run_load(app_url, args):
+    """Drive the API with args.concurrency workers and return (stats, elapsed)"""
+    names, weights = parse_mix(args.mix)
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+    stats = Stats()
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + args.duration
+
+    def worker():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            with lock:
+                if args.requests and issued[0] >= args.requests:
+                    return
+                issued[0] += 1
+            name = random.choices(names, weights=weights)[0]
+            SCENARIOS[name](session, app_url, random.choice(symbols), stats, args)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return stats, time.perf_counter() - start
+
+def build_report(stats, elapsed):
+    report = {"elapsed_s": elapsed, "endpoints": {}}
+    total = 0
+    total_errors = 0
+    for name, entry in sorted(stats.samples.items()):
+        count = entry["ok"] + entry["errors"]
+        total += count
+        total_errors += entry["errors"]
+        report["endpoints"][name] = {
+            "requests": count,
+            "throughput_rps": count / elapsed if elapsed else 0,
+            "error_rate": entry["errors"] / count if count else 0,
+            "p50_ms": percentile(entry["latency"], 50) * 1000,
+            "p99_ms": percentile(entry["latency"], 99) * 1000,
+            "ttfb_p50_ms": percentile(entry["ttfb"], 50) * 1000,
+            "ttfb_p99_ms": percentile(entry["ttfb"], 99) * 1000
+        }
+    report["requests"] = total
+    report["throughput_rps"] = total / elapsed if elapsed else 0
+    report["error_rate"] = total_errors / total if total else 0
+    return report
+
+def print_report(report):
+    header = f"{'endpoint':<20}{'reqs':>7}{'rps':>9}{'err%':>7}{'p50ms':>9}{'p99ms':>9}{'ttfb50':>9}{'ttfb99':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, r in report["endpoints"].items():
+        print(f"{name:<20}{r['requests']:>7}{r['throughput_rps']:>9.2f}{r['error_rate']*100:>7.1f}"
+              f"{r['p50_ms']:>9.0f}{r['p99_ms']:>9.0f}{r['ttfb_p50_ms']:>9.0f}{r['ttfb_p99_ms']:>9.0f}")
+    print("-" * len(header))
+    print(f"Total: {report['requests']} requests in {report['elapsed_s']:.1f}s, "
+          f"{report['throughput_rps']:.2f} req/s, error rate {report['error_rate']*100:.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the WFMoney API")
+    parser.add_argument("--app-url", help="Target an already running backend instead of spawning one")
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--llm-port", type=int, default=9000)
+    parser.add_argument("--data-dir", help="Data directory for the spawned backend (default: fresh temp dir)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many scenarios (0 = unlimited)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted scenario mix, e.g. history=3,analyze=1")
+    parser.add_argument("--symbols", default="BTC-USD,ETH-USD,AAPL", help="Comma-separated symbols to exercise")
+    parser.add_argument("--sim-date", help="Pass sim_date to analyze requests")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file")
+    parser.add_argument("--allow-writes", action="store_true",
+                        help="With --app-url, also run scenarios that write to positions.json (analyze, positions)")
+    fake_llm_server.add_arguments(parser)
+    args = parser.parse_args()
+    if args.app_url and not args.allow_writes:
+        writes = WRITE_SCENARIOS.intersection(parse_mix(args.mix)[0])
+        if writes:
+            parser.error(f"--app-url: scenarios {', '.join(sorted(writes))} modify positions.json of that backend; "
+                         f"drop them from --mix or pass --allow-writes")
+
+    processes = []
+    try:
+        if args.app_url:
+            app_url = args.app_url.rstrip("/")
+        else:
+            app_url, processes = spawn_servers(args)
+        print(f"Running {args.mix} against {app_url} with {args.concurrency} workers...")
+        stats, elapsed = run_load(app_url, args)
+        report = build_report(stats, elapsed)
+        print_report(report)
+        if args.json_path:
+            with open(args.json_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=4)
+    finally:
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.wait()
+
+if __name__ == "__main__":
+    main()
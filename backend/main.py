@@ -2,21 +2,50 @@ from fastapi import FastAPI, Query, Body
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from .utils import MarketDataFetcher
+from typing import List, Dict
+from .utils import MarketDataFetcher, get_cache
+from .frame_cache import expand_frame, clean_float
+from .routing import source_router
+from .analytics import position_performance, daily_closes, periods_per_year
+from concurrent.futures import ThreadPoolExecutor
 from .ai_analyzer import AIAnalyzer
 from .position_manager import PositionManager
+from . import providers
+from .config import INDICES_CONFIG
+from .scheduler import scheduler, load_watchlist, save_watchlist
+from .simulation import SimulationManager
+from .sweep import run_sweep
 import pandas as pd
 import json
+import os
 
 class ConfigUpdate(BaseModel):
     api_key: str = None
     base_url: str = None
     model_name: str = None
+    prompt_token_budget: int = None
 
 class PositionConfig(BaseModel):
     symbol: str
     total_budget: float
 
+class Watchlist(BaseModel):
+    symbols: List[str]
+
+class SimulationRequest(BaseModel):
+    symbol: str
+    start_date: str
+    end_date: str = None
+    total_budget: float = 10000
+
+class SweepRequest(BaseModel):
+    symbol: str
+    period: str = "5y"
+    grid: Dict[str, list] = None
+    fee_bps: float = 5.0
+    sort_by: str = "sharpe"
+    top: int = 50
+
 class PositionRecord(BaseModel):
     symbol: str
     date: str
@@ -35,6 +64,28 @@ app.add_middleware(
 
 analyzer = AIAnalyzer()
 pos_manager = PositionManager()
+simulations = SimulationManager(analyzer)
+
+@app.on_event("startup")
+def prewarm_providers():
+    """Import data providers in the background once the server is up (WFMONEY_PREWARM=0 disables)"""
+    if os.getenv("WFMONEY_PREWARM", "1") != "0":
+        providers.prewarm(extra_modules=("diskcache", "openai"), delay=1.0)
+
+@app.on_event("startup")
+def start_scheduler():
+    """Start background cache pre-warming (WFMONEY_SCHEDULER=0 disables)"""
+    if os.getenv("WFMONEY_SCHEDULER", "1") != "0":
+        scheduler.start()
+
+@app.on_event("shutdown")
+def stop_scheduler():
+    scheduler.stop()
+
+@app.on_event("shutdown")
+def stop_simulations():
+    """Stop running simulation jobs so the server can exit; they resume from their checkpoint"""
+    simulations.shutdown()
 
 @app.get("/api/config")
 def get_config():
@@ -43,14 +94,16 @@ def get_config():
         "api_key": f"{analyzer.api_key[:4]}...{analyzer.api_key[-4:]}" if analyzer.api_key and len(analyzer.api_key) > 8 else "Not Set",
         "base_url": analyzer.base_url or "Default (OpenAI)",
         "model_name": analyzer.model_name,
-        "is_demo": analyzer.client is None
+        "prompt_token_budget": analyzer.prompt_token_budget,
+        "is_demo": analyzer.is_demo
     }
 
 @app.post("/api/config")
 def update_config(config: ConfigUpdate):
     """Update AI configuration"""
-    analyzer.update_config(api_key=config.api_key, base_url=config.base_url, model_name=config.model_name)
-    return {"status": "success", "is_demo": analyzer.client is None}
+    analyzer.update_config(api_key=config.api_key, base_url=config.base_url, model_name=config.model_name,
+                           prompt_token_budget=config.prompt_token_budget)
+    return {"status": "success", "is_demo": analyzer.is_demo}
 
 @app.get("/api/market/quote")
 def get_quote(symbol: str):
@@ -58,21 +111,33 @@ def get_quote(symbol: str):
     df = MarketDataFetcher.get_data(symbol, period="1d", interval="1m")
     if df is not None and not df.empty:
         latest = df.iloc[-1]
+        price = clean_float(df['Close'].iloc[-1])
+        first = clean_float(df['Close'].iloc[0])
         return {
             "symbol": symbol,
-            "price": float(latest['Close']),
-            "change": float(latest['Close'] - df.iloc[0]['Close']),
-            "pct_change": float((latest['Close'] - df.iloc[0]['Close']) / df.iloc[0]['Close'] * 100),
+            "price": price,
+            "change": price - first,
+            "pct_change": (price - first) / first * 100,
             "time": str(latest['Date'])
         }
     return {"error": "Symbol not found or data unavailable"}
 
+@app.get("/api/market/sources")
+def get_source_status():
+    """Get data provider routing preferences and circuit breaker states"""
+    return source_router.status()
+
+@app.get("/api/market/cache")
+def get_cache_status():
+    """Get in-memory frame cache usage and hit rates"""
+    return get_cache().stats()
+
 @app.get("/api/market/history")
 def get_history(symbol: str, period: str = "1y", interval: str = "1d"):
     """Get historical data with indicators"""
-    df = MarketDataFetcher.get_data(symbol, period=period, interval=interval)
+    df = MarketDataFetcher.get_indicators(symbol, period=period, interval=interval)
     if df is not None:
-        df = MarketDataFetcher.calculate_indicators(df)
+        df = expand_frame(df)
         # Convert to list of dicts for JSON
         data = df.to_dict(orient="records")
         # Handle datetime conversion
@@ -84,9 +149,8 @@ def get_history(symbol: str, period: str = "1y", interval: str = "1d"):
 @app.get("/api/market/analyze")
 def analyze_market(symbol: str, sim_date: str = Query(None)):
     """Get AI analysis for a symbol with position context (streaming)"""
-    df = MarketDataFetcher.get_data(symbol, period="1y", interval="1d")
+    df = MarketDataFetcher.get_indicators(symbol, period="1y", interval="1d")
     if df is not None:
-        df = MarketDataFetcher.calculate_indicators(df)
         pos_summary = pos_manager.get_summary(symbol)
         
         def generate():
@@ -100,13 +164,33 @@ def analyze_market(symbol: str, sim_date: str = Query(None)):
 def get_position_summary(symbol: str):
     """Get position summary for a symbol with P&L stats"""
     # Try to get current price for unrealized P&L calculation
-    current_price = None
-    df = MarketDataFetcher.get_data(symbol, period="1d", interval="1m")
-    if df is not None and not df.empty:
-        current_price = float(df.iloc[-1]['Close'])
-        
+    current_price = MarketDataFetcher.get_latest_prices([symbol])[symbol]
     return pos_manager.get_summary(symbol, current_price=current_price)
 
+@app.get("/api/positions/portfolio")
+def get_portfolio(include_history: bool = False):
+    """Get summaries for all symbols with book-wide exposure and P&L"""
+    return pos_manager.get_portfolio(MarketDataFetcher.get_latest_prices, include_history=include_history)
+
+@app.get("/api/analytics/performance")
+def get_performance(symbol: str = Query(None), include_curve: bool = True):
+    """Equity curve, drawdown, Sharpe/Sortino, win rate, turnover and exposure of the trade history"""
+    symbols = [symbol] if symbol else list(pos_manager.positions.keys())
+
+    def evaluate(sym):
+        result = position_performance(
+            sym, pos_manager.get_position(sym),
+            lambda s, period: MarketDataFetcher.get_data(s, period=period, interval="1d")
+        )
+        if not include_curve:
+            result.pop("curve", None)
+        return result
+
+    if symbol:
+        return evaluate(symbol)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        return {"results": list(pool.map(evaluate, symbols))}
+
 @app.post("/api/positions/config")
 def update_position_config(config: PositionConfig):
     """Update total budget for a symbol"""
@@ -134,37 +218,92 @@ def clear_positions(symbol: str):
 @app.get("/api/market/indices")
 def get_major_indices():
     """Get quotes for major global indices and crypto"""
-    indices_config = {
-        "标普 500": "^GSPC",
-        "纳斯达克 100": "^IXIC",
-        "上证指数": "000001.SS",
-        "恒生指数": "^HSI",
-        "沪深 300": "000300.SS",
-        "日经 225": "^N225",
-        "比特币": "BTC-USD",
-        "以太坊": "ETH-USD"
-    }
-    
     results = {}
-    for name, symbol in indices_config.items():
+    for name, symbol in INDICES_CONFIG.items():
         try:
             # Add Nikkei 225 to fallbacks in utils if needed, but yfinance usually works for it
             df = MarketDataFetcher.get_data(symbol, period="10d", interval="1d")
             
             if df is not None and not df.empty:
-                latest = df.iloc[-1]
-                prev = df.iloc[-2] if len(df) > 1 else latest
+                latest = clean_float(df['Close'].iloc[-1])
+                prev = clean_float(df['Close'].iloc[-2]) if len(df) > 1 else latest
                 results[name] = {
                     "symbol": symbol,
-                    "price": float(latest['Close']),
-                    "change": float(latest['Close'] - prev['Close']),
-                    "pct_change": float((latest['Close'] - prev['Close']) / prev['Close'] * 100)
+                    "price": latest,
+                    "change": latest - prev,
+                    "pct_change": (latest - prev) / prev * 100
                 }
         except Exception as e:
             print(f"Error processing index {name}: {e}")
             continue
     return results
 
+@app.post("/api/simulations")
+def create_simulation(request: SimulationRequest):
+    """Start a checkpointed backend simulation job"""
+    return simulations.create(request.symbol, request.start_date, request.end_date, request.total_budget)
+
+@app.get("/api/simulations")
+def list_simulations():
+    """List simulation jobs with their status and progress"""
+    return simulations.list_jobs()
+
+@app.get("/api/simulations/{job_id}")
+def get_simulation(job_id: str, include_decisions: bool = False):
+    """Get a simulation job, optionally with every day's decision and the ledger"""
+    job = simulations.get(job_id, include_decisions=include_decisions)
+    return job if job else {"error": "Simulation not found"}
+
+@app.post("/api/simulations/{job_id}/resume")
+def resume_simulation(job_id: str):
+    """Resume an interrupted, failed or cancelled job from its last checkpoint"""
+    job = simulations.resume(job_id)
+    return job if job else {"error": "Simulation not found"}
+
+@app.post("/api/simulations/{job_id}/cancel")
+def cancel_simulation(job_id: str):
+    """Cancel a job; completed days stay checkpointed"""
+    job = simulations.cancel(job_id)
+    return job if job else {"error": "Simulation not found"}
+
+@app.post("/api/sweep")
+def sweep_strategy(request: SweepRequest):
+    """Evaluate a grid of rule-strategy parameters over a symbol's history and rank the results"""
+    df = MarketDataFetcher.get_data(request.symbol, period=request.period, interval="1d")
+    if df is None or df.empty:
+        return {"error": "Data unavailable for sweep"}
+    try:
+        result = run_sweep(
+            daily_closes(df).to_numpy(), grid=request.grid, fee_bps=request.fee_bps,
+            periods=periods_per_year(request.symbol), sort_by=request.sort_by, top=request.top
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    return {"symbol": request.symbol, "period": request.period, **result}
+
+@app.get("/api/scheduler/status")
+def get_scheduler_status():
+    """Get pre-warm scheduler state and the last warm result per symbol"""
+    return scheduler.status()
+
+@app.post("/api/scheduler/run")
+def run_scheduler(symbol: str = Query(None)):
+    """Pre-warm now (one symbol, or the whole watchlist and indices)"""
+    scheduler.trigger([symbol] if symbol else None)
+    return {"status": "started"}
+
+@app.get("/api/scheduler/watchlist")
+def get_watchlist():
+    """Get the symbols pre-warmed in addition to the dashboard indices"""
+    return {"symbols": load_watchlist()}
+
+@app.post("/api/scheduler/watchlist")
+def update_watchlist(watchlist: Watchlist):
+    """Replace the pre-warm watchlist"""
+    symbols = list(dict.fromkeys(s.strip() for s in watchlist.symbols if s.strip()))
+    save_watchlist(symbols)
+    return {"symbols": symbols}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
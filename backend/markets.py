@@ -0,0 +1,90 @@
+"""Trading sessions of the markets WFMoney covers.
+
+Used to decide when daily data is final (after the close) and how long a
+cached frame stays valid: while a market is closed nothing changes until
+the next open, so there is no point expiring its data after five minutes.
+Exchange holidays are not modelled; a holiday just costs one extra fetch.
+"""
+import pandas as pd
+
+SESSIONS = {
+    "us": {"tz": "America/New_York", "open": (9, 30), "close": (16, 0)},
+    "cn": {"tz": "Asia/Shanghai", "open": (9, 30), "close": (15, 0)},
+    "hk": {"tz": "Asia/Hong_Kong", "open": (9, 30), "close": (16, 10)},
+    "jp": {"tz": "Asia/Tokyo", "open": (9, 0), "close": (15, 30)}
+}
+INDEX_MARKETS = {
+    "^GSPC": "us",
+    "^IXIC": "us",
+    "^DJI": "us",
+    "^NDX": "us",
+    "^HSI": "hk",
+    "^N225": "jp"
+}
+DEFAULT_TTL = 300
+# Providers publish final daily bars a little after the close
+FINAL_DELAY_MINUTES = 20
+
+def market_of(symbol: str) -> str:
+    """Session market of a symbol: 'crypto', 'us', 'cn', 'hk', 'jp' or 'unknown' (sessions not modelled)"""
+    if "-" in symbol and "USD" in symbol:
+        return "crypto"
+    if symbol in INDEX_MARKETS:
+        return INDEX_MARKETS[symbol]
+    if symbol.endswith(".SS") or symbol.endswith(".SZ"):
+        return "cn"
+    if symbol.endswith(".HK"):
+        return "hk"
+    if symbol.endswith(".T"):
+        return "jp"
+    if symbol.isalpha() and len(symbol) <= 5: # Likely US Stock like AAPL
+        return "us"
+    # e.g. VOD.L, ^FTSE: no session, so frames keep the default TTL
+    return "unknown"
+
+def _at(day, hm):
+    return day.normalize() + pd.Timedelta(hours=hm[0], minutes=hm[1])
+
+def is_open(market: str, now: pd.Timestamp = None) -> bool:
+    if market not in SESSIONS:
+        return True
+    session = SESSIONS[market]
+    now = (now or pd.Timestamp.now(tz="UTC")).tz_convert(session["tz"])
+    return now.weekday() < 5 and _at(now, session["open"]) <= now < _at(now, session["close"])
+
+def next_open(market: str, now: pd.Timestamp = None):
+    """Next session open at or after now (None for 24/7 markets)"""
+    if market not in SESSIONS:
+        return None
+    session = SESSIONS[market]
+    now = (now or pd.Timestamp.now(tz="UTC")).tz_convert(session["tz"])
+    candidate = _at(now, session["open"])
+    if candidate <= now:
+        candidate += pd.Timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += pd.Timedelta(days=1)
+    return candidate
+
+def last_close(market: str, now: pd.Timestamp = None):
+    """Most recent session close at or before now (None for 24/7 markets)"""
+    if market not in SESSIONS:
+        return None
+    session = SESSIONS[market]
+    now = (now or pd.Timestamp.now(tz="UTC")).tz_convert(session["tz"])
+    candidate = _at(now, session["close"])
+    if candidate > now:
+        candidate -= pd.Timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate -= pd.Timedelta(days=1)
+    return candidate
+
+def cache_ttl(symbol: str, default: int = DEFAULT_TTL) -> int:
+    """Seconds a freshly fetched frame stays valid: until the next open once the closing bars are final"""
+    market = market_of(symbol)
+    now = pd.Timestamp.now(tz="UTC")
+    if is_open(market, now):
+        return default
+    if now < last_close(market, now) + pd.Timedelta(minutes=FINAL_DELAY_MINUTES):
+        # Fetched just after the close: the last bar may not be final yet
+        return default
+    return max(default, int((next_open(market, now) - now).total_seconds()))
@@ -4,8 +4,9 @@ from datetime import datetime
 from .config import get_data_path
 
 class PositionManager:
-    def __init__(self):
-        self.file_path = str(get_data_path("positions.json"))
+    def __init__(self, file_path=None):
+        # A separate file gives an isolated ledger, e.g. for a simulation job
+        self.file_path = str(file_path or get_data_path("positions.json"))
         self.positions = self._load_data()
 
     def _load_data(self):
@@ -128,18 +129,8 @@ class PositionManager:
             
         used_units = running_units
         remaining_units = pos["total_units"] - used_units
-        
-        # Unrealized P&L calculation fix
-        unrealized_pnl = 0
-        if current_price and used_units > 0 and avg_cost_price > 0:
-            unrealized_pnl = (current_price / avg_cost_price - 1) * used_units * unit_amount
-            
-        total_pnl = total_realized_pnl + unrealized_pnl
-        unrealized_pnl_pct = 0
-        if current_price and avg_cost_price > 0:
-            unrealized_pnl_pct = (current_price / avg_cost_price - 1)
             
-        return {
+        summary = {
             "symbol": symbol,
             "total_budget": total_budget,
             "used_units": used_units,
@@ -147,8 +138,76 @@ class PositionManager:
             "avg_cost_price": avg_cost_price, # This is the price of the asset (e.g., 3919)
             "current_holdings_value": used_units * unit_amount, # This is the money value (e.g., 3000)
             "total_realized_pnl": total_realized_pnl,
-            "unrealized_pnl": unrealized_pnl,
-            "unrealized_pnl_pct": unrealized_pnl_pct,
-            "total_pnl": total_pnl,
+            "unrealized_pnl": 0,
+            "unrealized_pnl_pct": 0,
+            "total_pnl": total_realized_pnl,
             "history": processed_history
         }
+        return self._apply_price(summary, current_price)
+
+    def _apply_price(self, summary, current_price):
+        """Fill in the unrealized P&L of a summary at current_price"""
+        total_budget = summary["total_budget"]
+        unit_amount = total_budget / 100 if total_budget > 0 else 0
+        used_units = summary["used_units"]
+        avg_cost_price = summary["avg_cost_price"]
+
+        # Unrealized P&L calculation fix
+        unrealized_pnl = 0
+        if current_price and used_units > 0 and avg_cost_price > 0:
+            unrealized_pnl = (current_price / avg_cost_price - 1) * used_units * unit_amount
+
+        unrealized_pnl_pct = 0
+        if current_price and avg_cost_price > 0:
+            unrealized_pnl_pct = (current_price / avg_cost_price - 1)
+
+        summary["unrealized_pnl"] = unrealized_pnl
+        summary["unrealized_pnl_pct"] = unrealized_pnl_pct
+        summary["total_pnl"] = summary["total_realized_pnl"] + unrealized_pnl
+        return summary
+
+    def get_portfolio(self, fetch_prices=None, include_history=False):
+        """Summaries for every symbol plus book-wide exposure and P&L in one pass.
+
+        fetch_prices(symbols) -> {symbol: price} is called once, for the held symbols only.
+        """
+        # Replay every ledger once; only symbols with open units need a current price
+        summaries = {symbol: self.get_summary(symbol) for symbol in list(self.positions.keys())}
+        held = [symbol for symbol, summary in summaries.items() if summary["used_units"] > 0]
+        prices = fetch_prices(held) if fetch_prices and held else {}
+        results = []
+        totals = {
+            "total_budget": 0,
+            "cost_value": 0,
+            "market_value": 0,
+            "total_realized_pnl": 0,
+            "unrealized_pnl": 0,
+            "total_pnl": 0
+        }
+        for symbol, summary in summaries.items():
+            current_price = prices.get(symbol)
+            self._apply_price(summary, current_price)
+            if not include_history:
+                summary.pop("history")
+            cost_value = summary["current_holdings_value"]
+            summary["current_price"] = current_price
+            summary["market_value"] = cost_value + summary["unrealized_pnl"]
+            summary["priced"] = current_price is not None or summary["used_units"] == 0
+            results.append(summary)
+
+            totals["total_budget"] += summary["total_budget"]
+            totals["cost_value"] += cost_value
+            totals["market_value"] += summary["market_value"]
+            totals["total_realized_pnl"] += summary["total_realized_pnl"]
+            totals["unrealized_pnl"] += summary["unrealized_pnl"]
+            totals["total_pnl"] += summary["total_pnl"]
+
+        budget = totals["total_budget"]
+        for summary in results:
+            # Share of the whole book's budget held in this symbol
+            summary["weight"] = summary["market_value"] / budget if budget > 0 else 0
+        totals["exposure"] = totals["market_value"] / budget if budget > 0 else 0
+        totals["total_pnl_pct"] = totals["total_pnl"] / budget if budget > 0 else 0
+        totals["symbols"] = len(results)
+        totals["unpriced_symbols"] = [s["symbol"] for s in results if not s["priced"]]
+        return {**totals, "positions": results}
@@ -0,0 +1,194 @@
+"""Compact, token-budgeted prompts for analyze_market_stream.
+
+Market and position context are encoded as CSV rows with rounded numbers.
+The tool schema and the static part of the system prompt are built once at
+import. History rows are added (newest first) while the prompt still fits in
+the token budget, so cheap symbols get more context for free.
+"""
+import math
+import os
+import pandas as pd
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("WFMONEY_PROMPT_TOKEN_BUDGET", "1200"))
+MIN_HISTORY_ROWS = 5
+MAX_HISTORY_ROWS = 60
+MAX_TRADE_RECORDS = 10
+MAX_NOTE_CHARS = 40
+
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "execute_trade",
+            "description": "执行买入或卖出操作。注意：只能操作当天，价格将自动按当前收盘价计算。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "action": {
+                        "type": "string",
+                        "enum": ["buy", "sell"],
+                        "description": "操作类型：buy (买入) 或 sell (卖出)"
+                    },
+                    "units": {
+                        "type": "number",
+                        "description": "操作份数 (1-100)"
+                    },
+                    "conclusion": {
+                        "type": "string",
+                        "description": "做出此交易决策的简要理由（将记录在交易历史中）"
+                    }
+                },
+                "required": ["action", "units", "conclusion"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "no_action",
+            "description": "决定当日不执行任何买入或卖出操作。调用此工具将记录一条当日的‘不操作’历史，以确认分析已完成。",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "reason": {
+                        "type": "string",
+                        "description": "不操作的简要原因（将记录在交易历史中）"
+                    }
+                },
+                "required": ["reason"]
+            }
+        }
+    }
+]
+
+SYSTEM_PROMPT_TEMPLATE = """你是一个专业的股票/加密货币分析师和交易员。
+请基于提供的历史K线数据和当前的持仓情况，给出今日的分析报告和操作建议。
+
+你的任务：
+1. 分析当前的市场趋势、支撑阻力位。
+2. 结合当前的仓位（已使用 {used_units}/100 份），决定是否需要买入、卖出或保持不动。
+3. **强制要求**：你必须调用 `execute_trade` 执行交易，或者调用 `no_action` 确认今日不操作。
+4. 如果你决定买入或卖出，请在 `conclusion` 中简要说明理由。如果你决定不操作，请在 `reason` 中简要说明理由。
+5. 你的分析必须基于当前日期 {sim_date} 的信息。
+
+请注意：预演模式下，你应该表现得像是在当天实时交易一样。
+数据为 CSV 格式，数值已四舍五入。
+"""
+
+MARKET_COLUMNS = [('Close', 'close', 6), ('RSI', 'rsi', 3), ('MACD', 'macd', 4), ('MA5', 'ma5', 6), ('MA20', 'ma20', 6)]
+MARKET_HEADER = "date," + ",".join(name for _, name, _ in MARKET_COLUMNS)
+TRADE_HEADER = "date,action,units,price,note"
+ACTIONS = {1: "buy", -1: "sell", 0: "hold"}
+
+_encoding = None
+
+def count_tokens(text: str) -> int:
+    """Token count via tiktoken when installed, otherwise a CJK-aware estimate"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    cjk = sum(1 for ch in text if ord(ch) > 0x2E80)
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+def fmt_number(value, significant: int = 6) -> str:
+    """Round to a number of significant digits without scientific notation"""
+    if value is None or pd.isna(value):
+        return ""
+    value = float(value)
+    if value == 0:
+        return "0"
+    decimals = significant - 1 - int(math.floor(math.log10(abs(value))))
+    text = f"{value:.{min(max(decimals, 0), 8)}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return text
+
+def encode_market_rows(df: pd.DataFrame):
+    """One CSV line per bar, oldest first"""
+    dates = pd.to_datetime(df['Date'])
+    intraday = bool((dates.dt.hour != 0).any() or (dates.dt.minute != 0).any())
+    date_strs = dates.dt.strftime('%Y-%m-%d %H:%M' if intraday else '%Y-%m-%d').tolist()
+    columns = [df[col].tolist() if col in df.columns else [None] * len(df) for col, _, _ in MARKET_COLUMNS]
+    digits = [d for _, _, d in MARKET_COLUMNS]
+    return [
+        ",".join([date_strs[i]] + [fmt_number(values[i], d) for values, d in zip(columns, digits)])
+        for i in range(len(df))
+    ]
+
+def encode_trade_rows(history):
+    rows = []
+    for r in history:
+        units = r['units']
+        action = ACTIONS[(units > 0) - (units < 0)]
+        note = str(r.get('conclusion') or r.get('reason') or "").replace(",", "，").replace("\n", " ")
+        if len(note) > MAX_NOTE_CHARS:
+            note = note[:MAX_NOTE_CHARS] + "…"
+        rows.append(f"{r['date']},{action},{fmt_number(abs(units))},{fmt_number(r['price'])},{note}")
+    return rows
+
+def encode_position(pos_summary: dict, trade_rows):
+    lines = [
+        f"持仓: {fmt_number(pos_summary['used_units'])}/100 份",
+        f"均价: {fmt_number(pos_summary['avg_cost_price'])}",
+        f"浮动收益率: {pos_summary.get('unrealized_pnl_pct', 0) * 100:.2f}%"
+    ]
+    if trade_rows:
+        lines += ["近期交易:", TRADE_HEADER] + trade_rows
+    else:
+        lines.append("近期交易: 无")
+    return "\n".join(lines)
+
+def build_messages(df: pd.DataFrame, pos_summary: dict, sim_date: str = None, token_budget: int = None):
+    """Build chat messages under token_budget; returns (messages, stats)"""
+    token_budget = token_budget or DEFAULT_TOKEN_BUDGET
+    system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+        used_units=fmt_number(pos_summary['used_units']),
+        sim_date=sim_date if sim_date else "最新数据"
+    )
+
+    trade_rows = encode_trade_rows(pos_summary['history'][-MAX_TRADE_RECORDS:])
+    market_rows = encode_market_rows(df.tail(MAX_HISTORY_ROWS))
+
+    def user_prompt(rows, trades):
+        return (
+            f"**近期市场数据 (最近{len(rows)}个周期):**\n{MARKET_HEADER}\n" + "\n".join(rows) +
+            f"\n\n**仓位上下文与历史操作:**\n{encode_position(pos_summary, trades)}"
+        )
+
+    base_tokens = count_tokens(system_prompt) + count_tokens(user_prompt([], trade_rows))
+    # Over budget even with the minimum history: drop the oldest trades first
+    min_rows = market_rows[-MIN_HISTORY_ROWS:]
+    min_cost = sum(count_tokens(row) + 1 for row in min_rows)
+    while trade_rows and base_tokens + min_cost > token_budget:
+        trade_rows = trade_rows[1:]
+        base_tokens = count_tokens(system_prompt) + count_tokens(user_prompt([], trade_rows))
+
+    # Then add history rows, newest first, while they fit
+    used = base_tokens
+    count = 0
+    for row in reversed(market_rows):
+        cost = count_tokens(row) + 1
+        if count >= MIN_HISTORY_ROWS and used + cost > token_budget:
+            break
+        used += cost
+        count += 1
+    rows = market_rows[len(market_rows) - count:] if count else []
+
+    prompt = user_prompt(rows, trade_rows)
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+    stats = {
+        "tokens": count_tokens(system_prompt) + count_tokens(prompt),
+        "token_budget": token_budget,
+        "history_rows": len(rows),
+        "trade_records": len(trade_rows)
+    }
+    return messages, stats
@@ -0,0 +1,44 @@
+"""Market data providers.
+
+Each provider lives in its own module and exposes
+``fetch(symbol, period, interval) -> DataFrame | None``. Provider modules
+(and the heavy libraries they import, akshare in particular) are only
+imported the first time they are used, or by prewarm() in the background.
+"""
+import importlib
+import threading
+import time
+
+PROVIDER_MODULES = {
+    "yfinance": "yahoo",
+    "akshare": "akshare_provider",
+    "binance": "binance"
+}
+
+def get_provider(name: str):
+    """Import (on first use) and return the provider module registered as name"""
+    if name not in PROVIDER_MODULES:
+        raise ValueError(f"Unknown data provider: {name}")
+    return importlib.import_module(f".{PROVIDER_MODULES[name]}", __name__)
+
+def prewarm(names=None, extra_modules=(), delay: float = 0):
+    """Import providers in a daemon thread so the first request does not pay for it"""
+    def run():
+        if delay:
+            time.sleep(delay)
+        for name in names or PROVIDER_MODULES:
+            try:
+                start = time.perf_counter()
+                get_provider(name)
+                print(f"Pre-warmed provider {name} in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                print(f"Failed to pre-warm provider {name}: {e}")
+        for module in extra_modules:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                print(f"Failed to pre-warm module {module}: {e}")
+
+    thread = threading.Thread(target=run, name="provider-prewarm", daemon=True)
+    thread.start()
+    return thread
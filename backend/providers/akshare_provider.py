@@ -0,0 +1,81 @@
+import akshare as ak
+import pandas as pd
+
+# Global indices served by ak.index_global_hist_em / ak.stock_zh_index_daily
+GLOBAL_INDICES = {
+    "^GSPC": "标普500",
+    "^IXIC": "纳斯达克",
+    "^HSI": "恒生指数",
+    "^N225": "日经225"
+}
+CN_INDICES = {
+    "000001.SS": "sh000001",
+    "000300.SS": "sh000300"
+}
+
+def fetch(symbol: str, period: str = "1y", interval: str = "1d"):
+    """Fetch daily bars for indices, A-shares and US stocks from akshare"""
+    df = None
+    if symbol.startswith("^") or symbol.endswith(".SS") or symbol.endswith(".SZ"):
+        print(f"Using akshare fallback for Index/A-share {symbol}")
+        if symbol in GLOBAL_INDICES:
+            df = ak.index_global_hist_em(symbol=GLOBAL_INDICES[symbol])
+        elif symbol in CN_INDICES:
+            df = ak.stock_zh_index_daily(symbol=CN_INDICES[symbol])
+        elif symbol.endswith(".SS") or symbol.endswith(".SZ"):
+            df = fetch_ashare("sh" + symbol.split(".")[0] if symbol.endswith(".SS") else "sz" + symbol.split(".")[0])
+
+        if df is not None and not df.empty:
+            # Robust column mapping
+            cols_map = {
+                '日期': 'Date', 'date': 'Date',
+                '开盘': 'Open', 'open': 'Open',
+                '最高': 'High', 'high': 'High',
+                '最低': 'Low', 'low': 'Low',
+                '收盘': 'Close', 'close': 'Close', '最新价': 'Close',
+                '成交量': 'Volume', 'volume': 'Volume'
+            }
+            new_cols = {}
+            for c in df.columns:
+                if c in cols_map:
+                    new_cols[c] = cols_map[c]
+
+            df = df.rename(columns=new_cols)
+            # Ensure basic columns exist
+            for col in ['Open', 'High', 'Low', 'Close']:
+                if col not in df.columns and 'Close' in df.columns:
+                    df[col] = df['Close'] # Fallback
+
+            if 'Date' in df.columns:
+                df['Date'] = pd.to_datetime(df['Date'])
+    elif symbol.isalpha() and len(symbol) <= 5: # Likely US Stock like AAPL
+        print(f"Using akshare fallback for US Stock {symbol}")
+        try:
+            df = ak.stock_us_hist(symbol=symbol, period="daily", adjust="")
+            if df is not None and not df.empty:
+                df = df[['日期', '开盘', '最高', '最低', '收盘', '成交量']]
+                df.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+                df['Date'] = pd.to_datetime(df['Date'])
+        except:
+            df = ak.stock_us_daily(symbol=symbol, adjust="")
+            if df is not None and not df.empty:
+                df.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+                df['Date'] = pd.to_datetime(df['Date'])
+
+    if df is None or df.empty:
+        return None
+    return df
+
+def fetch_ashare(symbol: str, period: str = "daily"):
+    """Fetch A-share bars; symbol uses the akshare format, e.g. 'sh600000'"""
+    df = ak.stock_zh_a_hist(symbol=symbol[2:], period=period, adjust="qfq")
+    if df is None or df.empty:
+        return None
+    cols_map = {
+        '日期': 'Date', '开盘': 'Open', '最高': 'High',
+        '最低': 'Low', '收盘': 'Close', '成交量': 'Volume'
+    }
+    present_cols = [c for c in cols_map.keys() if c in df.columns]
+    df = df[present_cols].rename(columns={c: cols_map[c] for c in present_cols})
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
@@ -0,0 +1,196 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ..timeframes import period_start, period_to_timedelta
+
+BASE_URL = "https://api.binance.com"
+PAGE_LIMIT = 1000     # max klines per request
+KLINES_WEIGHT = 2     # request weight of /api/v3/klines
+WEIGHT_BUDGET = 4800  # stay below the 6000/min IP limit, leaving room for other clients
+PAGE_WORKERS = 4
+PAGE_ATTEMPTS = 3
+PAGE_SECONDS = 1.0    # latency allowed per page when deriving the router deadline
+MAX_PAGES = 200       # 'max' periods keep the latest 200 pages (about 139 days of 1m bars)
+BINANCE_LAUNCH_MS = 1499990400000  # 2017-07-14, no klines before this
+
+# yfinance-style interval -> Binance interval; native Binance names pass through
+INTERVALS = {
+    "1m": "1m", "5m": "5m", "15m": "15m", "30m": "30m",
+    "60m": "1h", "1h": "1h", "1d": "1d", "1wk": "1w", "1mo": "1M"
+}
+NATIVE_INTERVALS = {"1s", "1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h", "1d", "3d", "1w", "1M"}
+# Intervals Binance lacks: fetch the finer interval and aggregate locally
+DERIVED_INTERVALS = {
+    "2m": ("1m", "2min"),
+    "90m": ("30m", "90min"),
+    "5d": ("1d", "5D"),
+    "3mo": ("1M", "3MS")
+}
+INTERVAL_MS = {
+    "1s": 1000, "1m": 60000, "3m": 180000, "5m": 300000, "15m": 900000, "30m": 1800000,
+    "1h": 3600000, "2h": 7200000, "4h": 14400000, "6h": 21600000, "8h": 28800000, "12h": 43200000,
+    "1d": 86400000, "3d": 259200000, "1w": 604800000, "1M": 31 * 86400000
+}
+COLUMNS = [
+    'Date', 'Open', 'High', 'Low', 'Close', 'Volume',
+    'CloseTime', 'QuoteAssetVolume', 'NumberTrades',
+    'TakerBuyBaseAssetVolume', 'TakerBuyQuoteAssetVolume', 'Ignore'
+]
+
+def _make_session():
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504], allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=PAGE_WORKERS * 2, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+# One keep-alive connection pool shared by every request in the process
+session = _make_session()
+
+class WeightLimiter:
+    """Tracks the X-MBX-USED-WEIGHT-1M header and waits for the next minute when the budget is spent"""
+    def __init__(self, budget: int = WEIGHT_BUDGET):
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.used = 0
+        self.window = int(time.time() // 60)
+        self.blocked_until = 0
+
+    def acquire(self, weight: int):
+        while True:
+            with self.lock:
+                now = time.time()
+                if int(now // 60) != self.window:
+                    self.window = int(now // 60)
+                    self.used = 0
+                if now >= self.blocked_until and self.used + weight <= self.budget:
+                    self.used += weight
+                    return
+                wait = max(self.blocked_until, (self.window + 1) * 60) - now
+            time.sleep(max(wait, 0.05))
+
+    def update(self, resp):
+        with self.lock:
+            used = resp.headers.get("X-MBX-USED-WEIGHT-1M")
+            if used is not None and int(time.time() // 60) == self.window:
+                self.used = max(self.used, int(used))
+            if resp.status_code in (418, 429):
+                retry_after = float(resp.headers.get("Retry-After", 60))
+                self.blocked_until = time.time() + retry_after
+
+limiter = WeightLimiter()
+
+def to_binance_symbol(symbol: str) -> str:
+    """BTC-USD -> BTCUSDT"""
+    return symbol.replace("-USD", "").upper() + "USDT"
+
+def _get_page(pair: str, interval: str, start_ms: int, end_ms: int, limit: int = PAGE_LIMIT):
+    params = {"symbol": pair, "interval": interval, "startTime": start_ms, "endTime": end_ms, "limit": limit}
+    for attempt in range(PAGE_ATTEMPTS):
+        limiter.acquire(KLINES_WEIGHT)
+        resp = session.get(f"{BASE_URL}/api/v3/klines", params=params, timeout=10)
+        limiter.update(resp)
+        if resp.status_code in (418, 429) and attempt < PAGE_ATTEMPTS - 1:
+            continue
+        # 429/418 on the last attempt surface as HTTPError so the router counts them against Binance
+        resp.raise_for_status()
+        data = resp.json()
+        return data if isinstance(data, list) else []
+
+def _get_frame(pair: str, interval: str, window):
+    # Converted per page so raw kline rows never pile up in memory
+    return _to_frame(_get_page(pair, interval, *window))
+
+def fetch_klines(pair: str, interval: str, start_ms: int = None, end_ms: int = None):
+    """Fetch klines for [start_ms, end_ms] as one frame, paging concurrently.
+
+    Without start_ms ('max') the range starts at the pair's first kline, but
+    covers at most the latest MAX_PAGES pages.
+    """
+    end_ms = end_ms or int(time.time() * 1000)
+    span = PAGE_LIMIT * INTERVAL_MS[interval]
+    truncated = False
+    if start_ms is None:
+        first = _get_page(pair, interval, 0, end_ms, limit=1)
+        if not first:
+            return None
+        start_ms = max(first[0][0], end_ms - MAX_PAGES * span)
+        truncated = start_ms > first[0][0]
+
+    pages = max(1, math.ceil((end_ms - start_ms) / span))
+    windows = [(start_ms + i * span, min(start_ms + (i + 1) * span - 1, end_ms)) for i in range(pages)]
+    if len(windows) == 1:
+        frames = [_get_frame(pair, interval, windows[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as pool:
+            frames = list(pool.map(lambda w: _get_frame(pair, interval, w), windows))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates(subset='Date').sort_values('Date').reset_index(drop=True)
+    # Tells the bar store this 'max' download is not the full history
+    df.attrs["truncated"] = truncated
+    return df
+
+def _to_frame(rows):
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    df['Date'] = pd.to_datetime(df['Date'], unit='ms')
+    for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        df[col] = pd.to_numeric(df[col])
+    df = df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
+    return df.drop_duplicates(subset='Date').sort_values('Date').reset_index(drop=True)
+
+def _aggregate(df: pd.DataFrame, rule: str):
+    out = df.set_index('Date').resample(rule).agg({
+        'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'
+    })
+    return out.dropna(subset=['Close']).reset_index()
+
+def resolve_interval(interval: str):
+    """(Binance interval, local resample rule or None); the interval is None when unsupported"""
+    rule = None
+    if interval in DERIVED_INTERVALS:
+        interval, rule = DERIVED_INTERVALS[interval]
+    return INTERVALS.get(interval, interval if interval in NATIVE_INTERVALS else None), rule
+
+def fetch_timeout(period: str, interval: str, base: float):
+    """Deadline for fetch() used by the router: base plus time for every page"""
+    binance_interval, _ = resolve_interval(interval)
+    if binance_interval is None:
+        return base
+    span = period_to_timedelta(period)
+    span_ms = span.total_seconds() * 1000 if span else time.time() * 1000 - BINANCE_LAUNCH_MS
+    pages = max(1, math.ceil(span_ms / (PAGE_LIMIT * INTERVAL_MS[binance_interval])))
+    if span is None:
+        # 'max': capped, plus the request that finds the first kline
+        pages = min(pages, MAX_PAGES) + 1
+    # Pages run PAGE_WORKERS at a time, and the weight budget caps how many fit in a minute
+    by_latency = pages / PAGE_WORKERS * PAGE_SECONDS
+    by_weight = pages * KLINES_WEIGHT / WEIGHT_BUDGET * 60
+    return base + max(by_latency, by_weight)
+
+def fetch(symbol: str, period: str = "1y", interval: str = "1d"):
+    """Fetch klines for a crypto pair such as BTC-USD covering the requested period"""
+    pair = to_binance_symbol(symbol)
+    binance_interval, rule = resolve_interval(interval)
+    if binance_interval is None:
+        print(f"Binance does not support interval {interval}")
+        return None
+
+    start = period_start(period)
+    start_ms = int(start.timestamp() * 1000) if start else None
+    print(f"Using Binance for Crypto {pair} ({period}/{binance_interval})")
+    df = fetch_klines(pair, binance_interval, start_ms)
+    if df is None:
+        return None
+    if rule:
+        truncated = df.attrs.get("truncated", False)
+        df = _aggregate(df, rule)
+        df.attrs["truncated"] = truncated
+    return df
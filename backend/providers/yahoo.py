@@ -0,0 +1,17 @@
+import yfinance as yf
+
+def fetch(symbol: str, period: str = "1y", interval: str = "1d"):
+    """Fetch OHLCV bars from Yahoo Finance"""
+    print(f"Fetching {symbol} with yfinance...")
+    # yfinance 0.2.40+ requires curl_cffi for some endpoints,
+    # but let's try without session first as it's more reliable now
+    ticker = yf.Ticker(symbol)
+    df = ticker.history(period=period, interval=interval)
+    if df is None or df.empty:
+        return None
+    print(f"yfinance success for {symbol}")
+    df = df.reset_index()
+    # Intraday frames are indexed by 'Datetime' instead of 'Date'
+    if 'Datetime' in df.columns:
+        df = df.rename(columns={'Datetime': 'Date'})
+    return df
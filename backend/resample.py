@@ -0,0 +1,176 @@
+"""Serve several views of a symbol from one stored download.
+
+Every provider download is kept in a bar store under the granularity it
+actually has (akshare, for instance, answers intraday requests with daily
+bars). A later request for the same symbol is answered by slicing a stored
+frame, or by aggregating a finer one, as long as the stored frame covers
+the requested period. Only otherwise does get_data go back to a provider.
+Stored dates are naive exchange-local times, whichever provider supplied them.
+"""
+import pandas as pd
+from datetime import timedelta
+from .timeframes import interval_seconds, period_to_timedelta
+from .frame_cache import expand_frame
+
+# Intervals we can build locally, with their pandas resample rules
+RESAMPLE_RULES = {
+    "1m": "1min",
+    "2m": "2min",
+    "5m": "5min",
+    "15m": "15min",
+    "30m": "30min",
+    "60m": "60min",
+    "90m": "90min",
+    "1h": "60min",
+    "1d": "1D",
+    "1wk": "W-MON",
+    "1mo": "MS"
+}
+# Download at least this much so one fetch also covers the shorter views
+FETCH_FLOOR = {
+    "1m": "5d",
+    "1d": "1y"
+}
+# Holidays and weekends mean a download never quite reaches its nominal start;
+# tolerate a gap of 20% of the requested period, between 1 and 5 days
+COVERAGE_SLACK_RATIO = 0.2
+COVERAGE_SLACK_MIN = timedelta(days=1)
+COVERAGE_SLACK_MAX = timedelta(days=5)
+BAR_TTL = 300
+
+def observed_interval(df: pd.DataFrame):
+    """Guess the granularity of a frame from the median spacing of its dates"""
+    if df is None or len(df) < 2 or 'Date' not in df.columns:
+        return None
+    seconds = df['Date'].diff().dropna().median().total_seconds()
+    best = None
+    for name in RESAMPLE_RULES:
+        size = interval_seconds(name)
+        if size <= seconds * 1.05:
+            if best is None or size > interval_seconds(best):
+                best = name
+    return best
+
+def wall_clock(dates: pd.Series) -> pd.Series:
+    """Naive exchange-local times: yfinance returns tz-aware dates, akshare and Binance naive ones"""
+    dates = pd.to_datetime(dates)
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates
+
+def fetch_period(period: str, interval: str) -> str:
+    """Widen a requested period to the floor for its interval"""
+    floor = FETCH_FLOOR.get(interval)
+    if floor is None or period == "max":
+        return period
+    wanted = period_to_timedelta(period)
+    if wanted is not None and wanted < period_to_timedelta(floor):
+        return floor
+    return period
+
+def slice_period(df: pd.DataFrame, period: str):
+    """Keep the bars of df that fall inside period, counted back from the last bar"""
+    if period == "max" or df.empty:
+        return df
+    last = df['Date'].iloc[-1]
+    if period == "1d":
+        # Like yfinance: the latest session rather than the last 24 hours
+        mask = df['Date'].dt.normalize() == last.normalize()
+    else:
+        span = period_to_timedelta(period)
+        if span is None:
+            return df
+        mask = df['Date'] > last - span
+    return df[mask].reset_index(drop=True)
+
+def resample_ohlcv(df: pd.DataFrame, interval: str):
+    """Aggregate OHLCV bars to a coarser interval"""
+    rule = RESAMPLE_RULES[interval]
+    kwargs = {}
+    seconds = interval_seconds(interval)
+    if seconds < 86400:
+        # Align bins to the session open (e.g. 09:30) rather than to midnight
+        last_day = df['Date'].dt.normalize() == df['Date'].iloc[-1].normalize()
+        session_open = df.loc[last_day, 'Date'].iloc[0]
+        minutes = (session_open - session_open.normalize()).total_seconds() // 60
+        kwargs["offset"] = f"{int(minutes % (seconds // 60))}min"
+    elif interval == "1wk":
+        # Weekly bars are labelled by the Monday they start on
+        kwargs = {"label": "left", "closed": "left"}
+    agg = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
+    if 'Volume' in df.columns:
+        agg['Volume'] = 'sum'
+    out = df.set_index('Date')[list(agg)].resample(rule, **kwargs).agg(agg)
+    return out.dropna(subset=['Close']).reset_index()
+
+class BarStore:
+    """Stored downloads per symbol and observed interval, kept in the market cache"""
+    def __init__(self, cache_getter):
+        self.cache_getter = cache_getter
+
+    def _key(self, symbol: str, interval: str):
+        return f"bars_{symbol}_{interval}"
+
+    def put(self, symbol: str, period: str, df: pd.DataFrame, ttl: int = BAR_TTL):
+        """Store a provider download; returns the interval it was stored under"""
+        interval = observed_interval(df)
+        if interval is None:
+            return None
+        # A capped 'max' download (Binance intraday) must not stand in for full history
+        truncated = df.attrs.get("truncated", False)
+        # One convention for every provider, so stored and new downloads compare
+        df = df.assign(Date=wall_clock(df['Date'])).sort_values('Date').reset_index(drop=True)
+        is_max = period == "max" and not truncated
+        cache = self.cache_getter()
+        existing = cache.get(self._key(symbol, interval))
+        if existing is not None and not is_max and existing["span"] > df['Date'].iloc[-1] - df['Date'].iloc[0]:
+            old = expand_frame(existing["df"])
+            old = old.assign(Date=wall_clock(old['Date']))
+            if old['Date'].iloc[-1] > df['Date'].iloc[-1]:
+                # The stored download is strictly newer
+                return interval
+            if old['Date'].iloc[-1] >= df['Date'].iloc[0]:
+                # Keep the longer history, but take every bar the new download covers
+                # from it: the last bar may have been partial when it was stored
+                df = pd.concat([old[old['Date'] < df['Date'].iloc[0]], df], ignore_index=True)
+                is_max = existing["is_max"]
+        entry = {
+            "df": df,
+            "is_max": is_max,
+            "span": df['Date'].iloc[-1] - df['Date'].iloc[0]
+        }
+        cache.set(self._key(symbol, interval), entry, expire=ttl)
+        return interval
+
+    def derive(self, symbol: str, period: str, interval: str):
+        """Build the requested view from stored bars, or return None if not covered"""
+        target = interval_seconds(interval)
+        if target is None or interval not in RESAMPLE_RULES:
+            return None
+        wanted = period_to_timedelta(period)
+        if wanted is None and period != "max":
+            return None
+        if wanted is not None:
+            slack = min(COVERAGE_SLACK_MAX, max(COVERAGE_SLACK_MIN, wanted * COVERAGE_SLACK_RATIO))
+        cache = self.cache_getter()
+        # Prefer the coarsest usable source: less to aggregate
+        sources = sorted(RESAMPLE_RULES, key=interval_seconds, reverse=True)
+        for source in sources:
+            size = interval_seconds(source)
+            if size > target or target % size != 0:
+                continue
+            entry = cache.get(self._key(symbol, source))
+            if entry is None:
+                continue
+            if period == "max":
+                if not entry["is_max"]:
+                    continue
+            elif not entry["is_max"] and entry["span"] + slack < wanted:
+                continue
+            df = slice_period(entry["df"], period)
+            if df.empty:
+                continue
+            if size != target:
+                df = resample_ohlcv(df, interval)
+            return df
+        return None
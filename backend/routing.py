@@ -0,0 +1,267 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from .providers import get_provider
+from .timeframes import interval_seconds
+
+# Empty results for this many distinct symbols within EMPTY_WINDOW seconds, with no
+# success in between, count as an outage: yfinance returns empty frames when it is down
+EMPTY_SYMBOLS_THRESHOLD = 3
+EMPTY_WINDOW = 60
+# curl_cffi (used by newer yfinance) exceptions that mean the transport failed
+CURL_OUTAGE_ERRORS = {"ConnectionError", "Timeout", "ConnectTimeout", "ReadTimeout", "ProxyError", "SSLError", "DNSError"}
+
+# Providers able to serve each market, in default priority order
+MARKET_PROVIDERS = {
+    "crypto": ["yfinance", "binance"],
+    "index": ["yfinance", "akshare"],
+    "ashare": ["yfinance", "akshare"],
+    "us": ["yfinance", "akshare"],
+    "other": ["yfinance"]
+}
+
+def granularity(interval: str) -> str:
+    """Bar class used to learn provider preferences: akshare, for one, only has daily bars"""
+    seconds = interval_seconds(interval)
+    return "intraday" if seconds is not None and seconds < 86400 else "daily"
+
+def is_provider_failure(exc: Exception) -> bool:
+    """True when exc means the provider itself is unavailable (network, timeout, 5xx, rate limit),
+    False when it only failed to look up the symbol (unknown code, 4xx)"""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    import requests
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, requests.exceptions.RetryError)):
+        return True
+    if type(exc).__module__.startswith("curl_cffi"):
+        # Matched by name: curl_cffi is optional and its exception classes move between versions
+        names = {cls.__name__ for cls in type(exc).__mro__}
+        if names & CURL_OUTAGE_ERRORS or type(exc).__name__ == "CurlError":
+            return True
+    # HTTP errors of requests and curl_cffi both carry the response
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500 or status in (418, 429)
+    return False
+
+def classify_market(symbol: str) -> str:
+    """Map a symbol to the market used for provider selection"""
+    if "-" in symbol and "USD" in symbol: # Crypto like BTC-USD
+        return "crypto"
+    if symbol.startswith("^"):
+        return "index"
+    if symbol.endswith(".SS") or symbol.endswith(".SZ"):
+        return "ashare"
+    if symbol.isalpha() and len(symbol) <= 5: # Likely US Stock like AAPL
+        return "us"
+    return "other"
+
+class CircuitBreaker:
+    """Classic closed / open / half-open breaker"""
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 120):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            # Let a single trial request through
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.time()
+
+    def trip(self):
+        """Open immediately"""
+        self.failures = max(self.failures, self.failure_threshold)
+        self.trial_in_flight = False
+        self.opened_at = time.time()
+
+class SourceRouter:
+    """Orders providers by past success and skips providers whose breaker is open.
+
+    Two breakers guard every attempt: one per provider (network errors, timeouts,
+    5xx and rate limits, i.e. the provider itself is down) and one per
+    provider/symbol pair (every failure, including lookup errors and empty
+    results, i.e. the provider does not carry that symbol). Empty results for
+    several different symbols in a short window also open the provider breaker.
+    """
+    def __init__(self, timeout: float = 15, failure_threshold: int = 3, reset_timeout: float = 120, race: bool = False):
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.race = race
+        self.lock = threading.Lock()
+        self.last_success = {} # (symbol or market, granularity) -> provider name
+        self.breakers = {}     # provider or (provider, symbol) -> CircuitBreaker
+        self.empty_results = {} # provider -> [(time, symbol)] since its last success
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="source-router")
+
+    def _breaker(self, key):
+        if key not in self.breakers:
+            self.breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.breakers[key]
+
+    def order(self, symbol: str, interval: str = "1d"):
+        """Candidate providers for symbol: last winner for the symbol, then for its market, then defaults"""
+        market = classify_market(symbol)
+        grain = granularity(interval)
+        candidates = list(MARKET_PROVIDERS[market])
+        preferred = [self.last_success.get((symbol, grain)), self.last_success.get((market, grain))]
+        for name in reversed([p for p in preferred if p in candidates]):
+            candidates.remove(name)
+            candidates.insert(0, name)
+        return candidates
+
+    def _acquire(self, name: str, symbol: str) -> bool:
+        with self.lock:
+            symbol_breaker = self._breaker((name, symbol))
+            if not symbol_breaker.allow():
+                return False
+            if not self._breaker(name).allow():
+                symbol_breaker.trial_in_flight = False
+                return False
+            return True
+
+    def _record(self, name: str, symbol: str, interval: str, ok: bool, provider_failed: bool = False, learn: bool = True):
+        with self.lock:
+            if ok:
+                self._breaker(name).record_success()
+                self._breaker((name, symbol)).record_success()
+                self.empty_results.pop(name, None)
+                if learn:
+                    grain = granularity(interval)
+                    self.last_success[(symbol, grain)] = name
+                    self.last_success[(classify_market(symbol), grain)] = name
+            else:
+                if provider_failed:
+                    self._breaker(name).record_failure()
+                else:
+                    # The provider answered, only this symbol is missing...
+                    self._breaker(name).trial_in_flight = False
+                    self._record_empty(name, symbol)
+                self._breaker((name, symbol)).record_failure()
+
+    def _record_empty(self, name: str, symbol: str):
+        """...unless many different symbols come back empty (call with the lock held)"""
+        now = time.time()
+        recent = [(t, s) for t, s in self.empty_results.get(name, []) if now - t < EMPTY_WINDOW]
+        recent.append((now, symbol))
+        if len({s for _, s in recent}) >= EMPTY_SYMBOLS_THRESHOLD:
+            print(f"{name} returned no data for {EMPTY_SYMBOLS_THRESHOLD} symbols, treating it as down")
+            self._breaker(name).trip()
+            recent = []
+        self.empty_results[name] = recent
+
+    def _timeout(self, name: str, period: str, interval: str):
+        """Seconds to wait for a provider; providers with long downloads (Binance paging) may extend it"""
+        deadline = getattr(get_provider(name), "fetch_timeout", None)
+        return deadline(period, interval, self.timeout) if deadline else self.timeout
+
+    def _submit(self, name: str, symbol: str, period: str, interval: str):
+        return self.executor.submit(get_provider(name).fetch, symbol, period, interval)
+
+    def _collect(self, name: str, symbol: str, interval: str, future, timeout: float, learn: bool = True):
+        """Wait for a provider future and update breakers; returns a frame or None"""
+        try:
+            df = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            print(f"{name} timed out for {symbol}")
+            self._record(name, symbol, interval, False, provider_failed=True)
+            return None
+        except Exception as e:
+            print(f"{name} failed for {symbol}: {e}")
+            self._record(name, symbol, interval, False, provider_failed=is_provider_failure(e))
+            return None
+        if df is None or df.empty:
+            self._record(name, symbol, interval, False)
+            return None
+        self._record(name, symbol, interval, True, learn=learn)
+        return df
+
+    def fetch(self, symbol: str, period: str = "1y", interval: str = "1d"):
+        """Fetch bars from the best available provider, falling through on failure"""
+        remaining = self.order(symbol, interval)
+        attempted = False
+
+        if self.race:
+            racers = []
+            while remaining and len(racers) < 2:
+                name = remaining.pop(0)
+                if self._acquire(name, symbol):
+                    racers.append(name)
+            attempted = bool(racers)
+            futures = {self._submit(name, symbol, period, interval): name for name in racers}
+            deadline = time.time() + max((self._timeout(name, period, interval) for name in racers), default=0)
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=max(0, deadline - time.time()), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    df = self._collect(futures[future], symbol, interval, future, 0)
+                    if df is not None:
+                        # A slower racer keeps running in the pool; its outcome only updates breakers
+                        for other in pending:
+                            other.add_done_callback(lambda f, name=futures[other]: self._collect(name, symbol, interval, f, 0, learn=False))
+                        return df
+            for future in pending:
+                self._collect(futures[future], symbol, interval, future, 0)
+
+        for name in remaining:
+            if not self._acquire(name, symbol):
+                continue
+            attempted = True
+            future = self._submit(name, symbol, period, interval)
+            df = self._collect(name, symbol, interval, future, self._timeout(name, period, interval))
+            if df is not None:
+                return df
+        if not attempted:
+            print(f"All providers for {symbol} are circuit-broken")
+        return None
+
+    def status(self):
+        """Breaker states and learned preferences, for diagnostics"""
+        with self.lock:
+            return {
+                "race": self.race,
+                "preferred": {f"{key}:{grain}": name for (key, grain), name in self.last_success.items()},
+                "breakers": {
+                    (key if isinstance(key, str) else f"{key[0]}:{key[1]}"): {
+                        "state": breaker.state,
+                        "failures": breaker.failures
+                    }
+                    for key, breaker in self.breakers.items()
+                }
+            }
+
+source_router = SourceRouter(
+    timeout=float(os.getenv("WFMONEY_PROVIDER_TIMEOUT", "15")),
+    race=os.getenv("WFMONEY_RACE_PROVIDERS", "0") == "1"
+)
@@ -0,0 +1,177 @@
+"""Background cache pre-warming for the watchlist and the dashboard indices.
+
+Each market is warmed once after its session close (plus a delay for the
+providers to publish final bars); crypto, which never closes, and symbols
+of markets without a modelled session are refreshed every cache TTL. The
+time of each market's last warm is kept in scheduler_state.json, so a
+restart (or a second uvicorn worker) only warms markets that are actually due. Warming forces a fresh download and
+pre-computes indicators, so dashboard and simulation requests hit a warm cache.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+from .config import get_data_path, INDICES_CONFIG
+from .markets import SESSIONS, market_of, last_close, DEFAULT_TTL, FINAL_DELAY_MINUTES
+from .utils import MarketDataFetcher
+
+# (period, interval) views fetched for every symbol; the first is also given indicators.
+# Only the first view of each interval is downloaded, the others are derived from its bars
+WARM_VIEWS = [("1y", "1d"), ("1d", "1m"), ("10d", "1d")]
+
+def load_watchlist():
+    path = get_data_path("watchlist.json")
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f).get("symbols", [])
+        except Exception as e:
+            print(f"Error loading watchlist: {e}")
+    return []
+
+def save_watchlist(symbols):
+    try:
+        with open(get_data_path("watchlist.json"), "w", encoding="utf-8") as f:
+            json.dump({"symbols": symbols}, f, indent=4, ensure_ascii=False)
+    except Exception as e:
+        print(f"Error saving watchlist: {e}")
+
+def load_last_run():
+    """Persisted market -> UTC timestamp of the last completed warm"""
+    path = get_data_path("scheduler_state.json")
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return {m: pd.Timestamp(t) for m, t in json.load(f).get("last_run", {}).items()}
+        except Exception as e:
+            print(f"Error loading scheduler state: {e}")
+    return {}
+
+def save_last_run(last_run):
+    try:
+        path = get_data_path("scheduler_state.json")
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"last_run": {m: t.isoformat() for m, t in last_run.items()}}, f, indent=4)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"Error saving scheduler state: {e}")
+
+class WarmScheduler:
+    def __init__(self, max_workers: int = 4, poll_seconds: int = 60, close_delay_minutes: int = FINAL_DELAY_MINUTES, crypto_interval: int = DEFAULT_TTL):
+        self.max_workers = max_workers
+        self.poll_seconds = poll_seconds
+        self.close_delay = pd.Timedelta(minutes=close_delay_minutes)
+        self.crypto_interval = crypto_interval
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.running = False
+        self.last_run = {}       # market -> UTC timestamp of last completed warm
+        self.symbol_status = {}  # symbol -> status of its last warm
+        self.started_at = None
+
+    def symbols(self):
+        """Watchlist plus dashboard indices, de-duplicated in order"""
+        return list(dict.fromkeys(load_watchlist() + list(INDICES_CONFIG.values())))
+
+    def _due(self, market: str, now: pd.Timestamp) -> bool:
+        last = self.last_run.get(market)
+        if last is None:
+            return True
+        if market not in SESSIONS:
+            # Crypto never closes and unknown markets have no modelled close: refresh every TTL
+            return (now - last).total_seconds() >= self.crypto_interval
+        close = last_close(market, now - self.close_delay)
+        return last < close + self.close_delay
+
+    def warm_symbol(self, symbol: str):
+        start = time.perf_counter()
+        status = {"market": market_of(symbol), "ok": True, "error": None}
+        downloaded = set()
+        try:
+            for i, (period, interval) in enumerate(WARM_VIEWS):
+                fresh = interval not in downloaded
+                downloaded.add(interval)
+                if i == 0:
+                    df = MarketDataFetcher.get_indicators(symbol, period=period, interval=interval, refresh=True)
+                else:
+                    df = MarketDataFetcher.get_data(symbol, period=period, interval=interval, refresh=fresh, rebuild=not fresh)
+                if df is None and i == 0:
+                    status.update(ok=False, error=f"No data for {period}/{interval}")
+        except Exception as e:
+            status.update(ok=False, error=str(e))
+        status["seconds"] = round(time.perf_counter() - start, 2)
+        status["warmed_at"] = datetime.now().isoformat(timespec="seconds")
+        with self.lock:
+            self.symbol_status[symbol] = status
+
+    def run_once(self, symbols=None, force: bool = False):
+        """Warm every market that is due (or everything when force), with bounded concurrency"""
+        now = pd.Timestamp.now(tz="UTC")
+        with self.lock:
+            # Another process sharing the data directory may have warmed since
+            for market, t in load_last_run().items():
+                if market not in self.last_run or t > self.last_run[market]:
+                    self.last_run[market] = t
+        groups = {}
+        for symbol in symbols or self.symbols():
+            groups.setdefault(market_of(symbol), []).append(symbol)
+        due = {m: syms for m, syms in groups.items() if force or self._due(m, now)}
+        if not due:
+            return
+        with self.lock:
+            self.running = True
+        try:
+            batch = [s for syms in due.values() for s in syms]
+            print(f"Pre-warming {len(batch)} symbols for {', '.join(due)}")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(self.warm_symbol, batch))
+            if symbols is None:
+                # A subset (e.g. /api/scheduler/run?symbol=X) leaves the rest of its market due
+                with self.lock:
+                    for market in due:
+                        self.last_run[market] = now
+                    save_last_run(self.last_run)
+        finally:
+            with self.lock:
+                self.running = False
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Pre-warm run failed: {e}")
+            self.stop_event.wait(self.poll_seconds)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.thread = threading.Thread(target=self._loop, name="warm-scheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def trigger(self, symbols=None):
+        """Warm now in the background, regardless of schedule"""
+        threading.Thread(target=self.run_once, kwargs={"symbols": symbols, "force": True}, daemon=True).start()
+
+    def status(self):
+        with self.lock:
+            return {
+                "enabled": bool(self.thread and self.thread.is_alive()),
+                "started_at": self.started_at,
+                "running": self.running,
+                "max_workers": self.max_workers,
+                "last_run": {m: t.isoformat() for m, t in self.last_run.items()},
+                "symbols": dict(self.symbol_status)
+            }
+
+scheduler = WarmScheduler(max_workers=int(os.getenv("WFMONEY_WARM_WORKERS", "4")))
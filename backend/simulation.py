@@ -0,0 +1,251 @@
+"""Backend simulation jobs that survive closed tabs, network blips and LLM errors.
+
+A job replays the AI decision for every trading day between start_date and
+end_date against its own ledger (a PositionManager backed by a per-job
+file). After each completed day the job checkpoints to disk: the last
+completed date and the decision (report text and trades) for that day.
+Resuming skips the days already decided and first rolls the ledger back to
+the checkpoint, so a day interrupted half-way never leaves a duplicate trade.
+"""
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+from .config import get_data_dir
+from .position_manager import PositionManager
+from .analytics import position_performance, history_period
+from .utils import MarketDataFetcher
+
+ERROR_MARKER = "分析过程中发生错误"
+DAY_RETRIES = 2
+INDICATOR_LOOKBACK_DAYS = 120
+RESUMABLE = {"interrupted", "failed", "cancelled"}
+
+def get_sim_dir():
+    sim_dir = get_data_dir() / "simulations"
+    sim_dir.mkdir(parents=True, exist_ok=True)
+    return sim_dir
+
+class SimulationCancelled(Exception):
+    pass
+
+class SimulationManager:
+    def __init__(self, analyzer, max_workers: int = 2):
+        self.analyzer = analyzer
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.cancel_flags = {}
+        self.shutting_down = False
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="simulation")
+        self._load_jobs()
+
+    def _job_path(self, job_id):
+        return get_sim_dir() / f"{job_id}.json"
+
+    def _ledger(self, job_id):
+        return PositionManager(file_path=get_sim_dir() / f"{job_id}_positions.json")
+
+    def _load_jobs(self):
+        for path in get_sim_dir().glob("*.json"):
+            if path.name.endswith("_positions.json"):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except Exception as e:
+                print(f"Error loading simulation {path.name}: {e}")
+                continue
+            # A job that was running when the server stopped can be resumed
+            if job["status"] in ("running", "pending"):
+                job["status"] = "interrupted"
+            self.jobs[job["id"]] = job
+
+    def _checkpoint(self, job):
+        """Write the job state atomically so a crash never leaves a torn file"""
+        job["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        path = self._job_path(job["id"])
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f, indent=4, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def create(self, symbol: str, start_date: str, end_date: str = None, total_budget: float = 10000):
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "symbol": symbol,
+            "start_date": start_date,
+            "end_date": end_date or datetime.now().strftime("%Y-%m-%d"),
+            "total_budget": total_budget,
+            "status": "pending",
+            "model_name": self.analyzer.model_name,
+            "total_days": None,
+            "completed_days": 0,
+            "last_completed_date": None,
+            "decisions": {},
+            "metrics": None,
+            "error": None,
+            "created_at": datetime.now().isoformat(timespec="seconds")
+        }
+        self._ledger(job_id).update_config(symbol, total_budget)
+        with self.lock:
+            self.jobs[job_id] = job
+            self._checkpoint(job)
+        self._start(job_id)
+        return self.summary(job)
+
+    def _start(self, job_id):
+        with self.lock:
+            self.cancel_flags[job_id] = threading.Event()
+        self.executor.submit(self._run, job_id)
+
+    def resume(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] not in RESUMABLE:
+                return self.summary(job)
+            job["status"] = "pending"
+            job["error"] = None
+            self._checkpoint(job)
+        self._start(job_id)
+        return self.summary(job)
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            flag = self.cancel_flags.get(job_id)
+            if job["status"] in ("pending", "running") and flag:
+                # The runner stops at the next chunk and records the cancellation
+                flag.set()
+            elif job["status"] in ("interrupted", "failed"):
+                job["status"] = "cancelled"
+                self._checkpoint(job)
+            return self.summary(job)
+
+    def shutdown(self):
+        """Stop every job at its next chunk, checkpointed as interrupted so it can be resumed"""
+        with self.lock:
+            self.shutting_down = True
+            for flag in self.cancel_flags.values():
+                flag.set()
+        self.executor.shutdown(wait=True)
+
+    def _rollback(self, ledger, job):
+        """Drop ledger records newer than the checkpoint"""
+        symbol = job["symbol"]
+        pos = ledger.positions.get(symbol)
+        if not pos:
+            return
+        last = job["last_completed_date"]
+        kept = [r for r in pos["history"] if last is not None and r["date"] <= last]
+        if len(kept) != len(pos["history"]):
+            pos["history"] = kept
+            ledger._save_data()
+
+    def _trading_dates(self, job):
+        # Reach back far enough before start_date for MA60 and friends to be warmed up
+        lookback_start = pd.Timestamp(job["start_date"]) - pd.Timedelta(days=INDICATOR_LOOKBACK_DAYS)
+        df = MarketDataFetcher.get_indicators(job["symbol"], period=history_period(lookback_start), interval="1d")
+        if df is None or df.empty:
+            raise RuntimeError(f"No price history for {job['symbol']}")
+        dates = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
+        window = dates[(dates >= job["start_date"]) & (dates <= job["end_date"])]
+        return df, list(dict.fromkeys(window))
+
+    def _run_day(self, job, df, ledger, date, cancel_flag):
+        """Run one simulated day; returns the decision or raises on LLM failure"""
+        chunks = []
+        for chunk in self.analyzer.analyze_market_stream(job["symbol"], df, None, pos_manager=ledger, sim_date=date):
+            chunks.append(chunk)
+            if cancel_flag.is_set():
+                raise SimulationCancelled()
+        report = "".join(chunks)
+        if ERROR_MARKER in report:
+            raise RuntimeError(report.strip().splitlines()[-1])
+        trades = [r for r in ledger.get_position(job["symbol"])["history"] if r["date"] == date]
+        return {"report": report, "trades": trades}
+
+    def _run(self, job_id):
+        job = self.jobs[job_id]
+        cancel_flag = self.cancel_flags[job_id]
+        ledger = self._ledger(job_id)
+        try:
+            if cancel_flag.is_set():
+                raise SimulationCancelled()
+            with self.lock:
+                job["status"] = "running"
+                self._checkpoint(job)
+            self._rollback(ledger, job)
+            df, dates = self._trading_dates(job)
+            job["total_days"] = len(dates)
+
+            for date in dates:
+                if date in job["decisions"]:
+                    continue
+                if cancel_flag.is_set():
+                    raise SimulationCancelled()
+                for attempt in range(DAY_RETRIES + 1):
+                    try:
+                        decision = self._run_day(job, df, ledger, date, cancel_flag)
+                        break
+                    except SimulationCancelled:
+                        raise
+                    except Exception as e:
+                        self._rollback(ledger, job)
+                        if attempt == DAY_RETRIES:
+                            raise RuntimeError(f"{date}: {e}")
+                        print(f"Simulation {job_id} retrying {date}: {e}")
+                with self.lock:
+                    job["decisions"][date] = decision
+                    job["last_completed_date"] = date
+                    job["completed_days"] = len(job["decisions"])
+                    self._checkpoint(job)
+
+            result = position_performance(
+                job["symbol"], ledger.get_position(job["symbol"]),
+                lambda s, period: MarketDataFetcher.get_data(s, period=period, interval="1d"),
+                end=job["end_date"]
+            )
+            with self.lock:
+                job["metrics"] = result.get("metrics")
+                job["status"] = "completed"
+                self._checkpoint(job)
+        except SimulationCancelled:
+            self._rollback(ledger, job)
+            with self.lock:
+                job["status"] = "interrupted" if self.shutting_down else "cancelled"
+                self._checkpoint(job)
+        except Exception as e:
+            self._rollback(ledger, job)
+            print(f"Simulation {job_id} failed: {e}")
+            with self.lock:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                self._checkpoint(job)
+
+    def summary(self, job, include_decisions: bool = False):
+        data = {k: v for k, v in job.items() if k != "decisions"}
+        if include_decisions:
+            data["decisions"] = dict(job["decisions"])
+        return data
+
+    def list_jobs(self):
+        with self.lock:
+            return sorted((self.summary(j) for j in self.jobs.values()), key=lambda j: j["created_at"], reverse=True)
+
+    def get(self, job_id, include_decisions: bool = False):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            summary = self.summary(job, include_decisions)
+            if include_decisions:
+                summary["ledger"] = self._ledger(job_id).get_summary(job["symbol"])
+            return summary
@@ -0,0 +1,177 @@
+"""Parameter sweeps for the rule strategy over one symbol's daily history.
+
+The rule (evaluated at each close, applied from the next day):
+    hold `units` of the 100-unit budget while the fast MA is above the slow MA,
+    go flat when RSI is above rsi_high, and hold 2 x units (max 100) when RSI
+    is below rsi_low.
+
+Moving averages (SMA via prefix sums, EMA via one recursive pass) and RSI are
+computed once per distinct window and shared by every parameter set that
+uses it. Each chunk of parameter sets is then scored as one
+(days x parameter sets) block; large grids are split across processes.
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .analytics import max_drawdown, sharpe_ratio, sortino_ratio
+
+DEFAULT_GRID = {
+    "ma_type": ["sma", "ema"],
+    "fast": [5, 10, 20],
+    "slow": [20, 60, 120],
+    "rsi_window": [14],
+    "rsi_low": [25, 30, 35],
+    "rsi_high": [65, 70, 75],
+    "units": [20, 50, 100]
+}
+# Keys whose values index arrays or size positions
+INT_KEYS = ["fast", "slow", "rsi_window", "units"]
+SORT_KEYS = ["sharpe", "sortino", "total_return", "annualized_return", "max_drawdown"]
+# Below this many parameter sets a process pool costs more than it saves
+PARALLEL_THRESHOLD = 500
+CHUNK_SIZE = 250
+
+def expand_grid(grid: dict = None):
+    """All valid parameter combinations of grid (missing keys use DEFAULT_GRID)"""
+    merged = {**DEFAULT_GRID, **(grid or {})}
+    unknown = set(merged) - set(DEFAULT_GRID)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+    for key in INT_KEYS:
+        for value in merged[key]:
+            if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+                raise ValueError(f"{key} values must be positive integers, got {value!r}")
+    for key in ("rsi_low", "rsi_high"):
+        for value in merged[key]:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{key} values must be numbers, got {value!r}")
+    keys = list(DEFAULT_GRID)
+    params = []
+    for values in itertools.product(*(merged[k] for k in keys)):
+        p = dict(zip(keys, values))
+        if p["ma_type"] not in ("sma", "ema"):
+            raise ValueError(f"Unknown ma_type: {p['ma_type']}")
+        if p["fast"] < p["slow"] and p["rsi_low"] < p["rsi_high"] and 0 < p["units"] <= 100:
+            params.append(p)
+    return params
+
+def sma(close: np.ndarray, window: int) -> np.ndarray:
+    """Simple moving average from prefix sums (NaN until the window is full)"""
+    out = np.full(len(close), np.nan)
+    if window <= len(close):
+        csum = np.concatenate([[0.0], np.cumsum(close)])
+        out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+def ema(close: np.ndarray, span: int) -> np.ndarray:
+    """Exponential moving average, same convention as calculate_indicators (adjust=False)"""
+    return pd.Series(close).ewm(span=span, adjust=False).mean().to_numpy()
+
+def rsi(close: np.ndarray, window: int) -> np.ndarray:
+    """RSI with simple rolling means, same convention as calculate_indicators"""
+    delta = np.diff(close, prepend=np.nan)
+    gain = sma(np.nan_to_num(np.where(delta > 0, delta, 0.0)), window)
+    loss = sma(np.nan_to_num(np.where(delta < 0, -delta, 0.0)), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - 100 / (1 + gain / loss)
+
+def precompute(close: np.ndarray, params):
+    """Indicator arrays for every distinct window in params"""
+    tables = {"sma": {}, "ema": {}, "rsi": {}}
+    for p in params:
+        table = tables[p["ma_type"]]
+        fn = sma if p["ma_type"] == "sma" else ema
+        for window in (p["fast"], p["slow"]):
+            if window not in table:
+                table[window] = fn(close, window)
+        if p["rsi_window"] not in tables["rsi"]:
+            tables["rsi"][p["rsi_window"]] = rsi(close, p["rsi_window"])
+    return tables
+
+def score(returns: np.ndarray, exposure: np.ndarray, changes: np.ndarray, periods: int):
+    """Metrics for a (days x sets) block of daily strategy returns"""
+    equity = np.vstack([np.ones((1, returns.shape[1])), np.cumprod(1 + returns, axis=0)])
+    days = max(len(returns), 1)
+    held = exposure > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Share of held days that gained (analytics' win_rate counts profitable closed trades instead)
+        positive_day_rate = np.where(held.sum(axis=0) > 0, ((returns > 0) & held).sum(axis=0) / held.sum(axis=0), 0.0)
+        annualized = np.where(equity[-1] > 0, equity[-1] ** (periods / days) - 1, -1.0)
+    return {
+        "total_return": equity[-1] - 1,
+        "annualized_return": annualized,
+        "max_drawdown": max_drawdown(equity),
+        "sharpe": sharpe_ratio(returns, periods),
+        "sortino": sortino_ratio(returns, periods),
+        "trades": (changes > 0).sum(axis=0),
+        "avg_exposure": exposure.mean(axis=0),
+        "positive_day_rate": positive_day_rate
+    }
+
+def evaluate(close: np.ndarray, tables: dict, params, fee: float, periods: int):
+    """Score a list of parameter sets in one vectorized pass"""
+    fast = np.column_stack([tables[p["ma_type"]][p["fast"]] for p in params])
+    slow = np.column_stack([tables[p["ma_type"]][p["slow"]] for p in params])
+    rsi_values = np.column_stack([tables["rsi"][p["rsi_window"]] for p in params])
+    units = np.array([p["units"] for p in params], dtype=float)
+    low = np.array([p["rsi_low"] for p in params], dtype=float)
+    high = np.array([p["rsi_high"] for p in params], dtype=float)
+
+    # NaN comparisons are False, so warm-up days stay flat
+    target = np.where(fast > slow, units, 0.0)
+    target = np.where(rsi_values > high, 0.0, target)
+    target = np.where(rsi_values < low, np.minimum(2 * units, 100), target)
+    exposure = target / 100
+
+    asset_returns = close[1:] / close[:-1] - 1
+    # Decided at close t, earning the return from t to t+1; fees on every change
+    position = exposure[:-1]
+    changes = np.abs(np.diff(exposure, axis=0, prepend=0))[:-1]
+    returns = position * asset_returns[:, None] - fee * changes
+
+    metrics = score(returns, position, changes, periods)
+    return [{**p, **_row(metrics, i)} for i, p in enumerate(params)]
+
+def _row(metrics: dict, i: int):
+    """Python scalars of column i of a score() block"""
+    return {k: int(v[i]) if k == "trades" else float(v[i]) for k, v in metrics.items()}
+
+def _evaluate_chunk(args):
+    return evaluate(*args)
+
+def run_sweep(close: np.ndarray, grid: dict = None, fee_bps: float = 5.0, periods: int = 252,
+              sort_by: str = "sharpe", top: int = 50, workers: int = None):
+    """Evaluate the grid over close prices and return the ranked results table"""
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+    close = np.asarray(close, dtype=np.float64)
+    if len(close) < 3:
+        raise ValueError("Not enough price history to sweep")
+    params = expand_grid(grid)
+    if not params:
+        raise ValueError("The parameter grid has no valid combinations")
+    fee = fee_bps / 10000
+    tables = precompute(close, params)
+
+    chunks = [params[i:i + CHUNK_SIZE] for i in range(0, len(params), CHUNK_SIZE)]
+    workers = workers or os.cpu_count() or 1
+    if len(params) >= PARALLEL_THRESHOLD and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            parts = pool.map(_evaluate_chunk, [(close, tables, chunk, fee, periods) for chunk in chunks])
+            results = [row for part in parts for row in part]
+    else:
+        results = [row for chunk in chunks for row in evaluate(close, tables, chunk, fee, periods)]
+
+    results.sort(key=lambda r: r[sort_by], reverse=True)
+    asset_returns = (close[1:] / close[:-1] - 1)[:, None]
+    ones = np.ones_like(asset_returns)
+    baseline = _row(score(asset_returns, ones, np.zeros_like(ones), periods), 0)
+    return {
+        "days": len(close),
+        "combinations": len(params),
+        "sort_by": sort_by,
+        "buy_and_hold": baseline,
+        "results": results[:top] if top else results
+    }
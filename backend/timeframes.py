@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+# Bar lengths of the yfinance-style intervals used across the API
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "2m": 120,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "60m": 3600,
+    "90m": 5400,
+    "1h": 3600,
+    "1d": 86400,
+    "5d": 5 * 86400,
+    "1wk": 7 * 86400,
+    "1mo": 30 * 86400,
+    "3mo": 91 * 86400
+}
+
+def interval_seconds(interval: str):
+    """Nominal length of one bar in seconds, or None for unknown intervals"""
+    return INTERVAL_SECONDS.get(interval)
+
+def period_to_timedelta(period: str):
+    """Convert a yfinance period such as '10d', '6mo' or '2y' to a timedelta.
+
+    Returns None for 'max' and for periods that cannot be parsed.
+    """
+    if period == "ytd":
+        now = datetime.now()
+        return now - datetime(now.year, 1, 1)
+    units = (("mo", 30), ("wk", 7), ("d", 1), ("y", 365))
+    for suffix, days in units:
+        if period.endswith(suffix):
+            try:
+                return timedelta(days=int(period[:-len(suffix)]) * days)
+            except ValueError:
+                return None
+    return None
+
+def period_start(period: str, end: datetime = None):
+    """Start of the window covered by period, ending at end (default: now)"""
+    span = period_to_timedelta(period)
+    if span is None:
+        return None
+    return (end or datetime.now()) - span
@@ -1,145 +1,94 @@
-import yfinance as yf
-import akshare as ak
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-import diskcache as dc
-import os
-import requests
 from datetime import datetime, timedelta
 from .config import get_data_dir
+from .routing import source_router
+from .resample import BarStore, fetch_period
+from .markets import cache_ttl
+from .frame_cache import FrameCache, clean_float
 
-# Initialize cache in the data directory
-cache = dc.Cache(str(get_data_dir() / "market_cache"))
+# The disk cache (behind an in-memory hot tier) is opened on first use so importing this module stays cheap
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Return the market data cache in the data directory, opening it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                import diskcache as dc
+                _cache = FrameCache(dc.Cache(str(get_data_dir() / "market_cache")))
+    return _cache
+
+bar_store = BarStore(get_cache)
 
 class MarketDataFetcher:
     @staticmethod
-    def get_data(symbol: str, period: str = "1y", interval: str = "1d"):
-        """Generic data fetcher with caching and multiple sources"""
-        cache_key = f"{symbol}_{period}_{interval}"
-        if cache_key in cache:
-            return cache[cache_key]
+    def get_data(symbol: str, period: str = "1y", interval: str = "1d", refresh: bool = False, rebuild: bool = False):
+        """Generic data fetcher with caching and multiple sources.
 
-        df = None
-        # Try yfinance first
-        try:
-            print(f"Fetching {symbol} with yfinance...")
-            # yfinance 0.2.40+ requires curl_cffi for some endpoints, 
-            # but let's try without session first as it's more reliable now
-            ticker = yf.Ticker(symbol)
-            df = ticker.history(period=period, interval=interval)
-            if df is not None and not df.empty:
-                print(f"yfinance success for {symbol}")
-                df = df.reset_index()
-                cache.set(cache_key, df, expire=300)
+        refresh=True bypasses the cache; rebuild=True only skips the cached view and
+        derives it again from stored bars when they cover it.
+        """
+        cache = get_cache()
+        cache_key = f"{symbol}_{period}_{interval}"
+        if not (refresh or rebuild):
+            df = cache.get(cache_key)
+            if df is not None:
                 return df
-        except Exception as e:
-            print(f"yfinance failed for {symbol}: {e}")
 
-        # Fallback to akshare for specific markets
-        try:
-            if symbol.startswith("^") or symbol.endswith(".SS") or symbol.endswith(".SZ"):
-                print(f"Using akshare fallback for Index/A-share {symbol}")
-                if symbol == "^GSPC":
-                    df = ak.index_global_hist_em(symbol="标普500")
-                elif symbol == "^IXIC":
-                    df = ak.index_global_hist_em(symbol="纳斯达克")
-                elif symbol == "^HSI":
-                    df = ak.index_global_hist_em(symbol="恒生指数")
-                elif symbol == "^N225":
-                    df = ak.index_global_hist_em(symbol="日经225")
-                elif symbol == "000001.SS":
-                    df = ak.stock_zh_index_daily(symbol="sh000001")
-                elif symbol == "000300.SS":
-                    df = ak.stock_zh_index_daily(symbol="sh000300")
-                elif symbol.endswith(".SS") or symbol.endswith(".SZ"):
-                    df = MarketDataFetcher.get_ashare_data("sh" + symbol.split(".")[0] if symbol.endswith(".SS") else "sz" + symbol.split(".")[0])
-                
-                if df is not None and not df.empty:
-                    # Robust column mapping
-                    cols_map = {
-                        '日期': 'Date', 'date': 'Date',
-                        '开盘': 'Open', 'open': 'Open',
-                        '最高': 'High', 'high': 'High',
-                        '最低': 'Low', 'low': 'Low',
-                        '收盘': 'Close', 'close': 'Close', '最新价': 'Close',
-                        '成交量': 'Volume', 'volume': 'Volume'
-                    }
-                    new_cols = {}
-                    for c in df.columns:
-                        if c in cols_map:
-                            new_cols[c] = cols_map[c]
-                    
-                    df = df.rename(columns=new_cols)
-                    # Ensure basic columns exist
-                    for col in ['Open', 'High', 'Low', 'Close']:
-                        if col not in df.columns and 'Close' in df.columns:
-                            df[col] = df['Close'] # Fallback
-                    
-                    if 'Date' in df.columns:
-                        df['Date'] = pd.to_datetime(df['Date'])
-            elif "-" in symbol and "USD" in symbol: # Crypto like BTC-USD
-                crypto_symbol = symbol.replace("-USD", "").upper() + "USDT"
-                print(f"Using Binance fallback for Crypto {crypto_symbol}")
-                try:
-                    url = f"https://api.binance.com/api/v3/klines?symbol={crypto_symbol}&interval=1d&limit=1000"
-                    resp = requests.get(url, timeout=10)
-                    data = resp.json()
-                    if data and isinstance(data, list):
-                        df = pd.DataFrame(data, columns=[
-                            'Date', 'Open', 'High', 'Low', 'Close', 'Volume',
-                            'CloseTime', 'QuoteAssetVolume', 'NumberTrades',
-                            'TakerBuyBaseAssetVolume', 'TakerBuyQuoteAssetVolume', 'Ignore'
-                        ])
-                        df['Date'] = pd.to_datetime(df['Date'], unit='ms')
-                        for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
-                            df[col] = pd.to_numeric(df[col])
-                        df = df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
-                except Exception as e:
-                    print(f"Binance fallback failed: {e}")
-            elif symbol.isalpha() and len(symbol) <= 5: # Likely US Stock like AAPL
-                print(f"Using akshare fallback for US Stock {symbol}")
-                try:
-                    df = ak.stock_us_hist(symbol=symbol, period="daily", adjust="")
-                    if df is not None and not df.empty:
-                        df = df[['日期', '开盘', '最高', '最低', '收盘', '成交量']]
-                        df.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-                        df['Date'] = pd.to_datetime(df['Date'])
-                except:
-                    df = ak.stock_us_daily(symbol=symbol, adjust="")
-                    if df is not None and not df.empty:
-                        df.columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-                        df['Date'] = pd.to_datetime(df['Date'])
-            
-            if df is not None and not df.empty:
-                cache.set(cache_key, df, expire=300)
-                return df
-        except Exception as e:
-            print(f"akshare fallback failed for {symbol}: {e}")
+        # Serve from an earlier download of this symbol when it covers the request
+        df = None if refresh else bar_store.derive(symbol, period, interval)
+        if df is None:
+            # Providers are tried in the order learned by the router, skipping broken ones
+            download_period = fetch_period(period, interval)
+            raw = source_router.fetch(symbol, download_period, interval)
+            if raw is None or raw.empty:
+                return None
+            bar_store.put(symbol, download_period, raw, ttl=cache_ttl(symbol))
+            df = bar_store.derive(symbol, period, interval)
+            if df is None:
+                # Coarser than requested (e.g. daily bars from akshare): return as is
+                df = raw
 
-        return None
+        cache.set(cache_key, df, expire=cache_ttl(symbol))
+        return df
 
     @staticmethod
-    def get_ashare_data(symbol: str, period: str = "daily"):
-        """Specialized A-share fetcher using akshare"""
-        cache_key = f"ak_{symbol}_{period}"
-        if cache_key in cache:
-            return cache[cache_key]
-        
-        try:
-            # akshare symbol format: 'sh600000'
-            df = ak.stock_zh_a_hist(symbol=symbol[2:], period=period, adjust="qfq")
-            if df is not None and not df.empty:
-                cols_map = {
-                    '日期': 'Date', '开盘': 'Open', '最高': 'High', 
-                    '最低': 'Low', '收盘': 'Close', '成交量': 'Volume'
-                }
-                present_cols = [c for c in cols_map.keys() if c in df.columns]
-                df = df[present_cols].rename(columns={c: cols_map[c] for c in present_cols})
-                df['Date'] = pd.to_datetime(df['Date'])
-                cache.set(cache_key, df, expire=300)
+    def get_indicators(symbol: str, period: str = "1y", interval: str = "1d", refresh: bool = False):
+        """get_data plus calculate_indicators, with the indicator frame cached as well (read-only)"""
+        cache = get_cache()
+        cache_key = f"ind_{symbol}_{period}_{interval}"
+        if not refresh:
+            df = cache.get(cache_key)
+            if df is not None:
                 return df
-        except Exception as e:
-            print(f"Error fetching A-share {symbol}: {e}")
-        return None
+        df = MarketDataFetcher.get_data(symbol, period=period, interval=interval, refresh=refresh)
+        if df is None:
+            return None
+        df = MarketDataFetcher.calculate_indicators(df.copy())
+        cache.set(cache_key, df, expire=cache_ttl(symbol))
+        return df
+
+    @staticmethod
+    def get_latest_prices(symbols, max_workers: int = 8):
+        """Latest close for each symbol, fetched concurrently (missing symbols map to None)"""
+        def latest(symbol):
+            try:
+                df = MarketDataFetcher.get_data(symbol, period="1d", interval="1m")
+                if df is not None and not df.empty:
+                    return clean_float(df['Close'].iloc[-1])
+            except Exception as e:
+                print(f"Error fetching latest price for {symbol}: {e}")
+            return None
+
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as pool:
+            return dict(zip(symbols, pool.map(latest, symbols)))
 
     @staticmethod
     def calculate_indicators(df: pd.DataFrame):
@@ -174,12 +123,12 @@ class MarketDataFetcher:
             
             # Bollinger Bands
             df['BB_Mid'] = df['Close'].rolling(window=20).mean()
-            df['BB_Std'] = df['Close'].rolling(window=20).std()
-            df['BB_Upper'] = df['BB_Mid'] + (df['BB_Std'] * 2)
-            df['BB_Lower'] = df['BB_Mid'] - (df['BB_Std'] * 2)
+            bb_std = df['Close'].rolling(window=20).std()
+            df['BB_Upper'] = df['BB_Mid'] + (bb_std * 2)
+            df['BB_Lower'] = df['BB_Mid'] - (bb_std * 2)
             
             # Replace NaN with 0 or drop them for JSON compliance
-            df = df.fillna(0)
+            df.fillna(0, inplace=True)
         except Exception as e:
             print(f"Error calculating indicators: {e}")
             